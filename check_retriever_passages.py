@@ -228,17 +228,19 @@ def main():
     results = []
     correct_count = 0
 
-    for i, question_data in enumerate(questions, 1):
-        question = question_data["question"]
-        correct_id = question_data.get("passage_id")
+    question_texts = [question_data["question"] for question_data in questions]
 
-        # Get retrieval results
-        if args.retriever == "hybrid":
-            result = retriever.get_relevant_passages(question)
-            passages = [passage for (passage, _) in result.passages[: args.top]]
-        else:
-            result = retriever.get_relevant_passages(question, size=args.top)
-            passages = [passage for (passage, _) in result.passages]
+    # Get retrieval results for all questions at once
+    if args.retriever == "hybrid":
+        batch_results = retriever.get_relevant_passages_batch(question_texts)
+    else:
+        batch_results = retriever.get_relevant_passages_batch(
+            question_texts, size=args.top
+        )
+
+    for question_data, result in zip(questions, batch_results):
+        correct_id = question_data.get("passage_id")
+        passages = [passage for (passage, _) in result.passages[: args.top]]
 
         # Check if correct passage is in top n
         retrieved_ids = [passage.id for passage in passages]
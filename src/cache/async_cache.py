@@ -0,0 +1,77 @@
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+from cache.cache import BULK_BATCH_SIZE
+from cache.memory_cache import MemoryCache
+
+
+class AsyncCache:
+    def __init__(self, memory_cache: MemoryCache = None):
+        mongo_client = AsyncIOMotorClient("mongodb://localhost:27017/")
+        db = mongo_client["polish-nl-qa"]
+        self.key_value_collection = db["key_value"]
+        self.memory_cache = MemoryCache() if memory_cache is None else memory_cache
+
+    async def get(self, key):
+        maybe_memory_value = self.memory_cache.get(key)
+
+        if maybe_memory_value is not None:
+            return maybe_memory_value
+
+        maybe_cached_value = await self.key_value_collection.find_one({"key": key})
+
+        if maybe_cached_value is None:
+            return None
+
+        self.memory_cache.set(key, maybe_cached_value["value"])
+
+        return maybe_cached_value["value"]
+
+    async def get_many(self, keys: list) -> dict:
+        values = {}
+        missing_keys = []
+
+        for key in dict.fromkeys(keys):
+            maybe_memory_value = self.memory_cache.get(key)
+
+            if maybe_memory_value is not None:
+                values[key] = maybe_memory_value
+            else:
+                missing_keys.append(key)
+
+        for i in range(0, len(missing_keys), BULK_BATCH_SIZE):
+            batch = missing_keys[i : i + BULK_BATCH_SIZE]
+            cursor = self.key_value_collection.find(
+                {"key": {"$in": batch}}, {"_id": 0, "key": 1, "value": 1}
+            )
+
+            async for item in cursor:
+                values[item["key"]] = item["value"]
+                self.memory_cache.set(item["key"], item["value"])
+
+        return values
+
+    # Relies on the unique key index created by the synchronous Cache
+    async def set(self, key, value):
+        await self.key_value_collection.replace_one(
+            {"key": key}, {"key": key, "value": value}, upsert=True
+        )
+        self.memory_cache.set(key, value)
+
+    async def set_many(self, items):
+        items = list(items.items() if isinstance(items, dict) else items)
+
+        for i in range(0, len(items), BULK_BATCH_SIZE):
+            batch = items[i : i + BULK_BATCH_SIZE]
+            operations = [
+                UpdateOne({"key": key}, {"$set": {"value": value}}, upsert=True)
+                for key, value in batch
+            ]
+            await self.key_value_collection.bulk_write(operations, ordered=False)
+
+        for key, value in items:
+            self.memory_cache.set(key, value)
+
+    async def unset(self, key):
+        self.memory_cache.unset(key)
+        return await self.key_value_collection.delete_one({"key": key})
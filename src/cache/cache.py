@@ -1,26 +1,202 @@
-from pymongo import MongoClient
+import threading
+from collections import defaultdict
+
+from pymongo import MongoClient, UpdateMany, UpdateOne
+from pymongo.errors import OperationFailure
+
+from cache.memory_cache import MemoryCache, get_key_prefix
 
 SIX_MONTHS = 60 * 60 * 24 * 30 * 6
 
+BULK_BATCH_SIZE = 1000
+
 
 class Cache:
-    def __init__(self):
+    def __init__(self, memory_cache: MemoryCache = None):
         mongo_client = MongoClient("mongodb://localhost:27017/")
         db = mongo_client["polish-nl-qa"]
         self.key_value_collection = db["key_value"]
+        self.memory_cache = MemoryCache() if memory_cache is None else memory_cache
+        self.mongo_hits = defaultdict(int)
+        self.mongo_misses = defaultdict(int)
+        self.stats_lock = threading.Lock()
+
+        self._ensure_key_index()
+
+    def _ensure_key_index(self):
+        key_index = self.key_value_collection.index_information().get("key_1")
+
+        # A plain index left by an earlier fallback blocks the unique one, it
+        # is only dropped once the duplicates are gone
+        if key_index is not None and not key_index.get("unique", False):
+            if self.count_duplicate_keys() > 0:
+                self._use_non_unique_keys()
+                return
+            self.key_value_collection.drop_index("key_1")
+
+        try:
+            self.key_value_collection.create_index("key", unique=True)
+            self.unique_keys = True
+        except OperationFailure as e:
+            # Older collections may still hold duplicated keys from the
+            # delete_many + insert_one era, fall back to a plain index
+            print(f"Could not create unique index on key ({e})")
+            self._use_non_unique_keys()
+
+    def _use_non_unique_keys(self):
+        print(
+            f"Found {self.count_duplicate_keys()} duplicated keys, using a "
+            "non-unique index on key until dedupe_keys removes them"
+        )
+        self.key_value_collection.create_index("key")
+        self.unique_keys = False
+
+    def _get_duplicate_keys(self):
+        return self.key_value_collection.aggregate(
+            [
+                {
+                    "$group": {
+                        "_id": "$key",
+                        "ids": {"$push": "$_id"},
+                        "latest": {"$max": "$_id"},
+                        "count": {"$sum": 1},
+                    }
+                },
+                {"$match": {"count": {"$gt": 1}}},
+            ],
+            allowDiskUse=True,
+        )
+
+    def count_duplicate_keys(self) -> int:
+        result = list(
+            self.key_value_collection.aggregate(
+                [
+                    {"$group": {"_id": "$key", "count": {"$sum": 1}}},
+                    {"$match": {"count": {"$gt": 1}}},
+                    {"$count": "duplicates"},
+                ],
+                allowDiskUse=True,
+            )
+        )
+
+        return result[0]["duplicates"] if result else 0
+
+    # Keeps the most recently inserted value of every duplicated key, then
+    # switches to the unique index
+    def dedupe_keys(self) -> int:
+        stale_ids = [
+            id
+            for duplicate in self._get_duplicate_keys()
+            for id in duplicate["ids"]
+            if id != duplicate["latest"]
+        ]
+
+        for i in range(0, len(stale_ids), BULK_BATCH_SIZE):
+            self.key_value_collection.delete_many(
+                {"_id": {"$in": stale_ids[i : i + BULK_BATCH_SIZE]}}
+            )
+
+        print(f"Removed {len(stale_ids)} duplicated cache entries")
+        self._ensure_key_index()
+
+        return len(stale_ids)
+
+    def _count(self, key, found: bool):
+        with self.stats_lock:
+            if found:
+                self.mongo_hits[get_key_prefix(key)] += 1
+            else:
+                self.mongo_misses[get_key_prefix(key)] += 1
 
     def get(self, key):
+        maybe_memory_value = self.memory_cache.get(key)
+
+        if maybe_memory_value is not None:
+            return maybe_memory_value
+
         maybe_cached_value = self.key_value_collection.find_one({"key": key})
 
+        self._count(key, maybe_cached_value is not None)
+
         if maybe_cached_value is None:
             return None
 
+        self.memory_cache.set(key, maybe_cached_value["value"])
+
         return maybe_cached_value["value"]
 
+    def get_many(self, keys: list) -> dict:
+        values = {}
+        missing_keys = []
+
+        for key in dict.fromkeys(keys):
+            maybe_memory_value = self.memory_cache.get(key)
+
+            if maybe_memory_value is not None:
+                values[key] = maybe_memory_value
+            else:
+                missing_keys.append(key)
+
+        for i in range(0, len(missing_keys), BULK_BATCH_SIZE):
+            batch = missing_keys[i : i + BULK_BATCH_SIZE]
+            cursor = self.key_value_collection.find(
+                {"key": {"$in": batch}}, {"_id": 0, "key": 1, "value": 1}
+            )
+
+            for item in cursor:
+                values[item["key"]] = item["value"]
+                self.memory_cache.set(item["key"], item["value"])
+
+            for key in batch:
+                self._count(key, key in values)
+
+        return values
+
     def set(self, key, value):
-        self.key_value_collection.delete_many({"key": key})
-        item = {"key": key, "value": value}
-        self.key_value_collection.insert_one(item)
+        if self.unique_keys:
+            self.key_value_collection.replace_one(
+                {"key": key}, {"key": key, "value": value}, upsert=True
+            )
+        else:
+            self.key_value_collection.delete_many({"key": key})
+            self.key_value_collection.insert_one({"key": key, "value": value})
+
+        self.memory_cache.set(key, value)
+
+    def set_many(self, items):
+        items = list(items.items() if isinstance(items, dict) else items)
+
+        for i in range(0, len(items), BULK_BATCH_SIZE):
+            batch = items[i : i + BULK_BATCH_SIZE]
+            operations = [
+                (
+                    UpdateOne({"key": key}, {"$set": {"value": value}}, upsert=True)
+                    if self.unique_keys
+                    else UpdateMany(
+                        {"key": key}, {"$set": {"value": value}}, upsert=True
+                    )
+                )
+                for key, value in batch
+            ]
+            self.key_value_collection.bulk_write(operations, ordered=False)
+
+        for key, value in items:
+            self.memory_cache.set(key, value)
 
     def unset(self, key):
+        self.memory_cache.unset(key)
         return self.key_value_collection.delete_one({"key": key})
+
+    def stats(self) -> dict:
+        memory_stats = self.memory_cache.stats()
+
+        with self.stats_lock:
+            prefixes = set(memory_stats) | set(self.mongo_hits) | set(self.mongo_misses)
+            return {
+                prefix: {
+                    "memory_hits": memory_stats.get(prefix, {}).get("hits", 0),
+                    "mongo_hits": self.mongo_hits[prefix],
+                    "misses": self.mongo_misses[prefix],
+                }
+                for prefix in sorted(prefixes)
+            }
@@ -0,0 +1,122 @@
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+ONE_HOUR = 60 * 60
+ONE_DAY = ONE_HOUR * 24
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Vectors, reranker scores and generated answers are pure functions of their
+# key, so they can stay in memory for long. Search results depend on what is
+# currently indexed, so they expire sooner.
+DEFAULT_PREFIX_TTLS = {
+    "vectorizer": ONE_DAY,
+    "reranker_score": ONE_DAY,
+    "generator": ONE_DAY,
+    "prompt": ONE_HOUR,
+    "query": ONE_HOUR,
+    "result": ONE_HOUR,
+}
+
+DEFAULT_TTL = ONE_HOUR
+
+
+def get_key_prefix(key: str) -> str:
+    prefix, separator, _ = key.partition(":")
+    return prefix if separator else ""
+
+
+def estimate_size(value) -> int:
+    if isinstance(value, (str, bytes, bytearray)):
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            estimate_size(k) + estimate_size(v) for k, v in value.items()
+        )
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class MemoryCache:
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        prefix_ttls: dict = None,
+        default_ttl: float = DEFAULT_TTL,
+    ):
+        self.max_bytes = max_bytes
+        self.prefix_ttls = (
+            DEFAULT_PREFIX_TTLS if prefix_ttls is None else dict(prefix_ttls)
+        )
+        self.default_ttl = default_ttl
+        self.current_bytes = 0
+        self.entries = OrderedDict()
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def _ttl(self, prefix: str):
+        return self.prefix_ttls.get(prefix, self.default_ttl)
+
+    def _remove(self, key):
+        _, size, _ = self.entries.pop(key)
+        self.current_bytes -= size
+
+    def get(self, key):
+        prefix = get_key_prefix(key)
+
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry is not None and entry[2] is not None and entry[2] < time.time():
+                self._remove(key)
+                entry = None
+
+            if entry is None:
+                self.misses[prefix] += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits[prefix] += 1
+            return entry[0]
+
+    def set(self, key, value):
+        size = estimate_size(key) + estimate_size(value)
+
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+
+            if size > self.max_bytes:
+                return
+
+            ttl = self._ttl(get_key_prefix(key))
+            expires_at = None if ttl is None else time.time() + ttl
+
+            self.entries[key] = (value, size, expires_at)
+            self.current_bytes += size
+
+            while self.current_bytes > self.max_bytes:
+                oldest_key = next(iter(self.entries))
+                self._remove(oldest_key)
+
+    def unset(self, key):
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict:
+        with self.lock:
+            prefixes = set(self.hits) | set(self.misses)
+            return {
+                prefix: {"hits": self.hits[prefix], "misses": self.misses[prefix]}
+                for prefix in sorted(prefixes)
+            }
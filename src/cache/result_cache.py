@@ -0,0 +1,187 @@
+import hashlib
+import json
+import unicodedata
+from typing import Dict, List, Tuple
+from cache.async_cache import AsyncCache
+from cache.cache import Cache
+from common.passage import Passage
+from common.result import normalize_scores
+
+# Bump when the stored entry layout or the scores it holds change meaning
+RESULT_CACHE_VERSION = 1
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", query).split())
+
+
+def get_result_hash(
+    backend: str, index_name: str, dataset_key: str, query: str, search_key: str = ""
+):
+    # JSON keeps field boundaries, plain concatenation does not
+    fields = [
+        RESULT_CACHE_VERSION,
+        backend,
+        index_name,
+        dataset_key,
+        normalize_query(query),
+        search_key,
+    ]
+    hashed = hashlib.sha256(json.dumps(fields).encode()).hexdigest()
+    return "result:" + hashed
+
+
+def decode_entry(value: str, size: int) -> List[Tuple[Passage, float]]:
+    if not value:
+        return None
+
+    entry = json.loads(value)
+
+    if entry["version"] != RESULT_CACHE_VERSION:
+        return None
+
+    # A shorter entry than asked for is still complete when the backend had
+    # nothing more to return
+    if entry["size"] < size and not entry["exhausted"]:
+        return None
+
+    return normalize_scores(
+        [
+            (Passage.from_dict(item["passage"]), item["score"])
+            for item in entry["passages"][:size]
+        ]
+    )
+
+
+def encode_entry(raw_passages: List[Tuple[Passage, float]], size: int) -> str:
+    return json.dumps(
+        {
+            "version": RESULT_CACHE_VERSION,
+            "size": size,
+            "exhausted": len(raw_passages) < size,
+            "passages": [
+                {"passage": passage.dict(), "score": score}
+                for passage, score in raw_passages
+            ],
+        }
+    )
+
+
+# Keeps the deepest top-k fetched per query with raw backend scores, smaller
+# sizes are sliced out of it and min-max normalized like a fresh search
+class ResultCache:
+    def __init__(self, cache: Cache, backend: str, index_name: str):
+        self.cache = cache
+        self.backend = backend
+        self.index_name = index_name
+
+    def _get_key(self, query: str, dataset_key: str, search_key: str):
+        return get_result_hash(
+            self.backend, self.index_name, dataset_key, query, search_key
+        )
+
+    def _get_keys(self, queries: List[str], dataset_key: str, search_key: str):
+        return {
+            query: self._get_key(query, dataset_key, search_key) for query in queries
+        }
+
+    def _get_items(
+        self,
+        raw_passages_by_query: Dict[str, List[Tuple[Passage, float]]],
+        dataset_key: str,
+        size: int,
+        search_key: str,
+    ) -> List[Tuple[str, str]]:
+        # Empty results are not stored, the index may still be loading
+        return [
+            (
+                self._get_key(query, dataset_key, search_key),
+                encode_entry(raw_passages, size),
+            )
+            for query, raw_passages in raw_passages_by_query.items()
+            if raw_passages
+        ]
+
+    def _decode(
+        self, keys: Dict[str, str], values: dict, size: int
+    ) -> Dict[str, List[Tuple[Passage, float]]]:
+        passages_by_query = {
+            query: decode_entry(values.get(key), size) for query, key in keys.items()
+        }
+
+        return {
+            query: passages
+            for query, passages in passages_by_query.items()
+            if passages is not None
+        }
+
+    def get_many(
+        self, queries: List[str], dataset_key: str, size: int, search_key: str = ""
+    ) -> Dict[str, List[Tuple[Passage, float]]]:
+        keys = self._get_keys(queries, dataset_key, search_key)
+        values = self.cache.get_many(list(keys.values()))
+
+        return self._decode(keys, values, size)
+
+    def get(self, query: str, dataset_key: str, size: int, search_key: str = ""):
+        return self.get_many([query], dataset_key, size, search_key).get(query)
+
+    def set_many(
+        self,
+        raw_passages_by_query: Dict[str, List[Tuple[Passage, float]]],
+        dataset_key: str,
+        size: int,
+        search_key: str = "",
+    ):
+        self.cache.set_many(
+            self._get_items(raw_passages_by_query, dataset_key, size, search_key)
+        )
+
+    def set(
+        self,
+        query: str,
+        raw_passages: List[Tuple[Passage, float]],
+        dataset_key: str,
+        size: int,
+        search_key: str = "",
+    ):
+        self.set_many({query: raw_passages}, dataset_key, size, search_key)
+
+
+# Same entries as ResultCache, shared with the synchronous repositories
+class AsyncResultCache(ResultCache):
+    def __init__(self, cache: AsyncCache, backend: str, index_name: str):
+        super().__init__(cache, backend, index_name)
+
+    async def get_many(
+        self, queries: List[str], dataset_key: str, size: int, search_key: str = ""
+    ) -> Dict[str, List[Tuple[Passage, float]]]:
+        keys = self._get_keys(queries, dataset_key, search_key)
+        values = await self.cache.get_many(list(keys.values()))
+
+        return self._decode(keys, values, size)
+
+    async def get(self, query: str, dataset_key: str, size: int, search_key: str = ""):
+        passages_by_query = await self.get_many([query], dataset_key, size, search_key)
+        return passages_by_query.get(query)
+
+    async def set_many(
+        self,
+        raw_passages_by_query: Dict[str, List[Tuple[Passage, float]]],
+        dataset_key: str,
+        size: int,
+        search_key: str = "",
+    ):
+        await self.cache.set_many(
+            self._get_items(raw_passages_by_query, dataset_key, size, search_key)
+        )
+
+    async def set(
+        self,
+        query: str,
+        raw_passages: List[Tuple[Passage, float]],
+        dataset_key: str,
+        size: int,
+        search_key: str = "",
+    ):
+        await self.set_many({query: raw_passages}, dataset_key, size, search_key)
@@ -1,10 +1,11 @@
 from pymongo import MongoClient
+from cache.cache import Cache
 
 
 client = MongoClient("mongodb://localhost:27017/")
 db = client["polish-nl-qa"]
 collection_name = "key_value"
-# prefixes = ["count", "vectorizer", "prompt", "reranker", "query", "score", "generator"]
+# prefixes = ["count", "vectorizer", "prompt", "reranker", "reranker_score", "query", "result", "score", "generator"]
 prefixes = []
 collection = db[collection_name]
 
@@ -12,4 +13,9 @@ for prefix in prefixes:
     print(f"Clearing keys with prefix: {prefix}")
     collection.delete_many({"key": {"$regex": f"^{prefix}:.*"}})
 
+# Removes keys duplicated before the unique key index, so it can be created
+dedupe = False
+if dedupe:
+    Cache().dedupe_keys()
+
 client.close()
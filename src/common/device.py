@@ -0,0 +1,55 @@
+import os
+
+import torch
+
+DEVICE_ENV = "POLISH_NL_QA_DEVICE"
+NUM_THREADS_ENV = "POLISH_NL_QA_NUM_THREADS"
+NUM_INTEROP_THREADS_ENV = "POLISH_NL_QA_NUM_INTEROP_THREADS"
+
+_cpu_threads_configured = False
+
+
+def _configure_cpu_threads():
+    global _cpu_threads_configured
+
+    if _cpu_threads_configured:
+        return
+
+    num_threads = int(os.environ.get(NUM_THREADS_ENV, os.cpu_count() or 1))
+    num_interop_threads = int(
+        os.environ.get(NUM_INTEROP_THREADS_ENV, max(1, min(4, num_threads // 4)))
+    )
+
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(num_interop_threads)
+    except RuntimeError:
+        # Can only be set once, before any inter-op parallel work has started
+        pass
+
+    _cpu_threads_configured = True
+    print(
+        f"CPU inference with {num_threads} intra-op and {num_interop_threads} inter-op threads"
+    )
+
+
+# Device resolve_device would pick, without configuring anything
+def detect_device(device: str = None) -> str:
+    device = device or os.environ.get(DEVICE_ENV)
+
+    if device:
+        return device
+    if torch.cuda.is_available():
+        return "cuda"
+    if torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
+
+def resolve_device(device: str = None) -> str:
+    device = detect_device(device)
+
+    if device == "cpu":
+        _configure_cpu_threads()
+
+    return device
@@ -1,3 +1,4 @@
+import time
 from common.passage_factory import PassageFactory
 from repository.es_repository import ESRepository
 
@@ -7,15 +8,43 @@ class ESDataImporter:
         self,
         repository: ESRepository,
         passage_factory: PassageFactory,
+        batch_size: int = 10,
+        parallel: bool = False,
+        thread_count: int = 4,
+        chunk_size: int = 500,
+        max_chunk_bytes: int = 10 * 1024 * 1024,
     ):
         self.repository = repository
         self.passage_factory = passage_factory
+        self.batch_size = batch_size
+        self.parallel = parallel
+        self.thread_count = thread_count
+        self.chunk_size = chunk_size
+        self.max_chunk_bytes = max_chunk_bytes
 
     def import_data(self):
-        passages = self.passage_factory.get_passages()
-
-        for i in range(0, len(passages), 10):
-            part_of_passages = passages[i : i + 10]
+        if self.parallel:
+            return self.import_data_parallel()
 
+        processed = 0
+        for part_of_passages in self.passage_factory.iter_batches(self.batch_size):
             self.repository.insert_many(part_of_passages)
-            print(f"Processed {i+10} passages")
+            processed += len(part_of_passages)
+            print(f"Processed {processed} passages")
+
+    def import_data_parallel(self):
+        start = time.perf_counter()
+
+        success_count, failed_count = self.repository.insert_many_parallel(
+            self.passage_factory.iter_passages(),
+            thread_count=self.thread_count,
+            chunk_size=self.chunk_size,
+            max_chunk_bytes=self.max_chunk_bytes,
+        )
+
+        elapsed = time.perf_counter() - start
+        docs_per_second = success_count / elapsed if elapsed > 0 else 0
+        print(
+            f"Indexed {success_count} passages into {self.repository.index_name} "
+            f"({failed_count} failed) at {docs_per_second:.0f} docs/sec"
+        )
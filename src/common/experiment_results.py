@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import time
+from typing import Dict, List
+from common.utils import (
+    get_all_es_index_combinations,
+    get_all_openai_model_combinations,
+    get_all_qdrant_model_combinations,
+)
+
+EXPERIMENT_DIRECTORY = "experiments"
+
+ES_BACKEND = "es"
+QDRANT_BACKEND = "qdrant"
+OPENAI_BACKEND = "openai"
+
+
+class ExperimentJob:
+    def __init__(
+        self,
+        backend: str,
+        index: str,  # ES index or embedding model
+        distance: str,
+        dataset_key: str,
+        reranker: str,
+        top_k: int,
+    ):
+        self.backend = backend
+        self.index = index
+        self.distance = distance
+        self.dataset_key = dataset_key
+        self.reranker = reranker
+        self.top_k = top_k
+
+    def key(self) -> str:
+        return json.dumps(
+            [
+                self.backend,
+                self.index,
+                self.distance,
+                self.dataset_key,
+                self.reranker,
+                self.top_k,
+            ]
+        )
+
+    def dict(self) -> dict:
+        return {
+            "backend": self.backend,
+            "index": self.index,
+            "distance": self.distance,
+            "dataset_key": self.dataset_key,
+            "reranker": self.reranker,
+            "top_k": self.top_k,
+        }
+
+    def from_dict(data: dict):
+        return ExperimentJob(
+            data["backend"],
+            data["index"],
+            data["distance"],
+            data["dataset_key"],
+            data["reranker"],
+            data["top_k"],
+        )
+
+
+def get_experiment_jobs(
+    backends: List[str], rerankers: List[str], top_ks: List[int]
+) -> List[ExperimentJob]:
+    cells = []
+    if ES_BACKEND in backends:
+        cells += [
+            (ES_BACKEND, index, None, dataset_key)
+            for index, dataset_key in get_all_es_index_combinations()
+        ]
+    if QDRANT_BACKEND in backends:
+        cells += [
+            (QDRANT_BACKEND, model, distance.value, dataset_key)
+            for model, distance, dataset_key in get_all_qdrant_model_combinations()
+        ]
+    if OPENAI_BACKEND in backends:
+        cells += [
+            (OPENAI_BACKEND, model, distance.value, dataset_key)
+            for model, distance, dataset_key in get_all_openai_model_combinations()
+        ]
+
+    return [
+        ExperimentJob(backend, index, distance, dataset_key, reranker, top_k)
+        for backend, index, distance, dataset_key in cells
+        for reranker in rerankers
+        for top_k in top_ks
+    ]
+
+
+# Finished cells are appended one JSON line at a time, so a crash loses at
+# most the cell that was being written. A cell is stale when its fingerprint,
+# built from everything the scores depend on besides the job itself, changes.
+class ExperimentResultsStore:
+    def __init__(self, name: str, directory: str = EXPERIMENT_DIRECTORY):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{name}.jsonl")
+        self.records: Dict[str, dict] = {}
+
+        if os.path.isfile(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                content = f.read()
+
+            for line in content.splitlines():
+                # A line cut short by a crash is simply run again
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self.records[record["key"]] = record
+
+            # Keeps the next record off the end of a cut short line
+            if content and not content.endswith("\n"):
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("\n")
+
+    def is_current(self, job: ExperimentJob, fingerprint: str) -> bool:
+        record = self.records.get(job.key())
+        return record is not None and record["fingerprint"] == fingerprint
+
+    def save(self, job: ExperimentJob, fingerprint: str, scores: dict):
+        record = {
+            "key": job.key(),
+            "fingerprint": fingerprint,
+            "job": job.dict(),
+            "scores": scores,
+            "finished_at": time.time(),
+        }
+
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.records[record["key"]] = record
+
+    def get_scores(self) -> Dict[str, dict]:
+        return {key: record["scores"] for key, record in self.records.items()}
+
+
+def get_fingerprint(*parts) -> str:
+    return hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()
@@ -0,0 +1,63 @@
+import json
+import os
+import threading
+from typing import Iterable
+from common.passage import Passage
+from common.utils import get_passage_content_hash, get_passage_point_id
+
+MANIFEST_DIRECTORY = "manifests"
+
+
+class IngestionManifest:
+    def __init__(
+        self, name: str, directory: str = MANIFEST_DIRECTORY, save_every: int = 1000
+    ):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{name}.json")
+        self.save_every = save_every
+        self.unsaved = 0
+        self.lock = threading.Lock()
+        self.is_new = not os.path.isfile(self.path)
+
+        if not self.is_new:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.content_hashes = json.load(f)
+        else:
+            self.content_hashes = {}
+
+    def is_current(self, passage: Passage) -> bool:
+        point_id = get_passage_point_id(passage)
+
+        with self.lock:
+            return self.content_hashes.get(point_id) == get_passage_content_hash(
+                passage
+            )
+
+    def mark(self, passages: Iterable[Passage]):
+        with self.lock:
+            for passage in passages:
+                self.content_hashes[get_passage_point_id(passage)] = (
+                    get_passage_content_hash(passage)
+                )
+                self.unsaved += 1
+
+            if self.unsaved >= self.save_every:
+                self._save()
+
+    def forget(self, passages: Iterable[Passage]):
+        with self.lock:
+            for passage in passages:
+                self.content_hashes.pop(get_passage_point_id(passage), None)
+            self._save()
+
+    def save(self):
+        with self.lock:
+            self._save()
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.content_hashes, f)
+
+        os.replace(tmp_path, self.path)
+        self.unsaved = 0
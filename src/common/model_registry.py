@@ -0,0 +1,171 @@
+import gc
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+import torch
+from sentence_transformers import CrossEncoder, SentenceTransformer
+
+MODEL_MEMORY_ENV = "POLISH_NL_QA_MODEL_MEMORY_GB"
+
+DEFAULT_MAX_BYTES = 4 * 1024**3
+
+SENTENCE_TRANSFORMER = "sentence_transformer"
+CROSS_ENCODER = "cross_encoder"
+
+
+def get_model_size(model) -> int:
+    # Older CrossEncoder versions wrap the torch module instead of being one
+    module = model if hasattr(model, "parameters") else model.model
+
+    return sum(
+        tensor.numel() * tensor.element_size()
+        for tensor in list(module.parameters()) + list(module.buffers())
+    )
+
+
+def load_model(kind: str, model_name: str, device: str, max_length: int):
+    if kind == CROSS_ENCODER:
+        return CrossEncoder(model_name, max_length=max_length, device=device)
+
+    model = SentenceTransformer(model_name, device=device)
+    if max_length is not None:
+        model.max_seq_length = max_length
+
+    return model
+
+
+class ModelEntry:
+    def __init__(self, model, size: int):
+        self.model = model
+        self.size = size
+        self.references = 0
+
+
+# Every model is loaded once per process and shared by all its users. Models
+# nobody holds stay loaded for reuse until the memory cap needs the room, the
+# least recently used go first.
+class ModelRegistry:
+    def __init__(self, max_bytes: int = None):
+        if max_bytes is None:
+            max_bytes = (
+                int(float(os.environ[MODEL_MEMORY_ENV]) * 1024**3)
+                if MODEL_MEMORY_ENV in os.environ
+                else DEFAULT_MAX_BYTES
+            )
+
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.entries = OrderedDict()
+        # Sizes of every model loaded so far, kept after eviction
+        self.sizes = {}
+        self.lock = threading.RLock()
+
+    def _evict(self, needed_bytes: int):
+        evicted = False
+
+        for key in list(self.entries):
+            if self.current_bytes + needed_bytes <= self.max_bytes:
+                break
+
+            entry = self.entries[key]
+            if entry.references > 0:
+                continue
+
+            print(f"Unloading model {key[1]} from {key[2]}")
+            del self.entries[key]
+            self.current_bytes -= entry.size
+            evicted = True
+
+        if evicted:
+            gc.collect()
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+
+    # A model never loaded before is assumed to be as large as the largest one
+    # seen, the models compared in one run are of similar size
+    def _estimate_size(self, key: tuple) -> int:
+        if key in self.sizes:
+            return self.sizes[key]
+
+        return max(self.sizes.values(), default=0)
+
+    # The model is released when owner is garbage collected, or earlier by
+    # calling the returned finalizer
+    def acquire(
+        self,
+        owner,
+        kind: str,
+        model_name: str,
+        device: str,
+        max_length: int = None,
+    ):
+        key = (kind, model_name, device, max_length)
+
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry is None:
+                # Room is made before loading, otherwise the cached models and
+                # the new one are all resident at once
+                self._evict(self._estimate_size(key))
+
+                model = load_model(kind, model_name, device, max_length)
+                size = get_model_size(model)
+                self.sizes[key] = size
+
+                if self.current_bytes + size > self.max_bytes:
+                    self._evict(size)
+                if self.current_bytes + size > self.max_bytes:
+                    print(f"Model {model_name} goes over the model memory cap")
+
+                entry = ModelEntry(model, size)
+                self.entries[key] = entry
+                self.current_bytes += size
+
+            self.entries.move_to_end(key)
+            entry.references += 1
+
+            return entry.model, weakref.finalize(owner, self.release, key)
+
+    def release(self, key: tuple):
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry is None:
+                return
+
+            entry.references -= 1
+
+            if self.current_bytes > self.max_bytes:
+                self._evict(0)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "models": [
+                    {
+                        "key": list(key),
+                        "bytes": entry.size,
+                        "references": entry.references,
+                    }
+                    for key, entry in self.entries.items()
+                ],
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    global _registry
+
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+
+        return _registry
@@ -1,4 +1,4 @@
-from typing import Dict, List
+from typing import Iterable, Iterator, List
 from common.dataset_entry import DatasetEntry
 from common.passage import Passage
 from common.utils import get_dataset_key
@@ -17,40 +17,54 @@ class PassageFactory:
         self.chunk_size = self.text_splitter._chunk_size
         self.chunk_overlap = self.text_splitter._chunk_overlap
 
-    def _get_unique_entries(self, dataset: List[DatasetEntry]) -> List[DatasetEntry]:
-        unique_entries: List[DatasetEntry] = []
+    def _get_unique_entries(
+        self, dataset: Iterable[DatasetEntry]
+    ) -> Iterator[DatasetEntry]:
+        seen_passage_ids = set()
         for entry in dataset:
-            if not any(
-                entry.passage_id == unique_entry.passage_id
-                for unique_entry in unique_entries
-            ):
-                unique_entries.append(entry)
+            if entry.passage_id not in seen_passage_ids:
+                seen_passage_ids.add(entry.passage_id)
+                yield entry
 
-        return unique_entries
+    def iter_passages(
+        self, length=1000000000, dataset: Iterable[DatasetEntry] = None
+    ) -> Iterator[Passage]:
+        if dataset is None:
+            dataset = self.dataset_getter.get_test_dataset()
 
-    def get_passages(self, length=1000000000) -> List[Passage]:
-        dataset = self.dataset_getter.get_test_dataset()
-        unique_entries = self._get_unique_entries(dataset)
-
-        passages: List[Passage] = []
-        for i, (entry) in enumerate(unique_entries):
+        for i, entry in enumerate(self._get_unique_entries(dataset)):
             splits = self.text_splitter.create_documents([entry.context])
             start_index = 0
             for split in splits:
-                passages.append(
-                    Passage(
-                        entry.passage_id,
-                        entry.title,
-                        split.page_content,
-                        start_index,
-                        entry.dataset,
-                        get_dataset_key(entry.dataset, self.chunk_size),
-                        entry.metadata,
-                    )
+                yield Passage(
+                    entry.passage_id,
+                    entry.title,
+                    split.page_content,
+                    start_index,
+                    entry.dataset,
+                    get_dataset_key(entry.dataset, self.chunk_size),
+                    entry.metadata,
                 )
                 start_index += len(split.page_content) - self.chunk_overlap
             print(f"Processed {i+1} passages")
             if i + 1 == length:
                 break
 
-        return passages
+    def iter_batches(
+        self,
+        batch_size: int = 64,
+        length=1000000000,
+        dataset: Iterable[DatasetEntry] = None,
+    ) -> Iterator[List[Passage]]:
+        batch: List[Passage] = []
+        for passage in self.iter_passages(length, dataset):
+            batch.append(passage)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+
+        if batch:
+            yield batch
+
+    def get_passages(self, length=1000000000) -> List[Passage]:
+        return list(self.iter_passages(length))
@@ -0,0 +1,61 @@
+from typing import List
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from common.names import CHUNK_SIZES, DATASET_NAMES
+from common.passage_factory import PassageFactory
+from common.passage_store import PassageStore
+from common.relevance_count_index import RelevanceCountIndex
+from common.utils import get_dataset_key
+from dataset.dataset_getter import DatasetGetter
+from dataset.polqa_dataset_getter import PolqaDatasetGetter
+from dataset.poquad_dataset_getter import PoquadDatasetGetter
+
+
+def get_dataset_getter(dataset_name: str) -> DatasetGetter:
+    return (
+        dataset_name == "ipipan/polqa" and PolqaDatasetGetter() or PoquadDatasetGetter()
+    )
+
+
+def get_passage_factory(
+    chunk_size: int, chunk_overlap: int, dataset_getter: DatasetGetter
+) -> PassageFactory:
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap, strip_whitespace=True
+    )
+
+    return PassageFactory(text_splitter, dataset_getter)
+
+
+def build_passage_store(store: PassageStore, rebuild: bool = False) -> List[str]:
+    relevance_counts = RelevanceCountIndex(store)
+    dataset_keys = []
+
+    for dataset_name in DATASET_NAMES:
+        missing_chunk_sizes = [
+            (chunk_size, chunk_overlap)
+            for chunk_size, chunk_overlap in CHUNK_SIZES
+            if rebuild or not store.has(get_dataset_key(dataset_name, chunk_size))
+        ]
+
+        if missing_chunk_sizes:
+            # Each dataset is loaded once and split for every missing chunk size
+            dataset_getter = get_dataset_getter(dataset_name)
+            dataset = dataset_getter.get_test_dataset()
+
+            for chunk_size, chunk_overlap in missing_chunk_sizes:
+                dataset_key = get_dataset_key(dataset_name, chunk_size)
+                passage_factory = get_passage_factory(
+                    chunk_size, chunk_overlap, dataset_getter
+                )
+                count = store.save(
+                    dataset_key, passage_factory.iter_passages(dataset=dataset)
+                )
+                print(f"Stored {count} passages for {dataset_key}")
+
+                relevance_counts.build(dataset_key)
+
+        dataset_keys += [
+            get_dataset_key(dataset_name, chunk_size) for chunk_size, _ in CHUNK_SIZES
+        ]
+
+    return dataset_keys
@@ -0,0 +1,67 @@
+import json
+import os
+from typing import Iterable, Iterator, List
+from common.passage import Passage
+
+PASSAGE_STORE_DIRECTORY = "passages"
+
+
+class PassageStore:
+    def __init__(self, directory: str = PASSAGE_STORE_DIRECTORY):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def get_path(self, dataset_key: str) -> str:
+        return os.path.join(self.directory, f"{dataset_key}.jsonl")
+
+    def has(self, dataset_key: str) -> bool:
+        return os.path.isfile(self.get_path(dataset_key))
+
+    def save(self, dataset_key: str, passages: Iterable[Passage]) -> int:
+        path = self.get_path(dataset_key)
+        tmp_path = f"{path}.tmp"
+
+        count = 0
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for passage in passages:
+                f.write(json.dumps(passage.dict(), ensure_ascii=False) + "\n")
+                count += 1
+
+        # Only a completely written split replaces the previous one
+        os.replace(tmp_path, path)
+
+        return count
+
+    def iter_passages(self, dataset_key: str) -> Iterator[Passage]:
+        with open(self.get_path(dataset_key), "r", encoding="utf-8") as f:
+            for line in f:
+                yield Passage.from_dict(json.loads(line))
+
+    def iter_batches(
+        self, dataset_key: str, batch_size: int = 64
+    ) -> Iterator[List[Passage]]:
+        batch: List[Passage] = []
+        for passage in self.iter_passages(dataset_key):
+            batch.append(passage)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+
+        if batch:
+            yield batch
+
+
+# Passages of one dataset key, usable by importers in place of a PassageFactory
+class StoredPassages:
+    def __init__(self, store: PassageStore, dataset_key: str):
+        self.store = store
+        self.dataset_key = dataset_key
+
+    def iter_passages(self) -> Iterator[Passage]:
+        return self.store.iter_passages(self.dataset_key)
+
+    def iter_batches(self, batch_size: int = 64) -> Iterator[List[Passage]]:
+        return self.store.iter_batches(self.dataset_key, batch_size)
+
+    def get_passages(self) -> List[Passage]:
+        return list(self.iter_passages())
@@ -1,35 +1,173 @@
+import queue
+import threading
+import time
+from typing import List
+from common.ingestion_manifest import IngestionManifest
 from common.passage_factory import PassageFactory
 from common.utils import get_query_with_prefix
 from repository.qdrant_repository import QdrantRepository
 from vectorizer.vectorizer import Vectorizer
 
+END_OF_STREAM = object()
+
 
 class QdrantDataImporter:
     def __init__(
         self,
-        repository: QdrantRepository,
+        repositories: List[QdrantRepository],
         passage_factory: PassageFactory,
         vectorizer: Vectorizer,
         prefix: str = "",
+        batch_size: int = 64,
+        upload_batch_size: int = 256,
+        upload_parallel: int = 1,
+        queue_size: int = 8,  # embedded batches buffered before embedding waits
+        manifests: List[IngestionManifest] = None,  # one per repository
     ):
-        self.repository = repository
+        self.repositories = repositories
         self.passage_factory = passage_factory
         self.vectorizer = vectorizer
         self.prefix = prefix
+        self.batch_size = batch_size
+        self.upload_batch_size = upload_batch_size
+        self.upload_parallel = upload_parallel
+        self.queue_size = queue_size
+        self.manifests = manifests or [None] * len(repositories)
 
-    def import_data(self):
-        passages = self.passage_factory.get_passages()
+    def _embed(self, queues: List[queue.Queue], stats: dict, errors: list):
+        try:
+            for part_of_passages in self.passage_factory.iter_batches(self.batch_size):
+                # Passages already uploaded with the same content everywhere are
+                # skipped, so reruns resume and only embed new or changed ones
+                pending_passages = [
+                    passage
+                    for passage in part_of_passages
+                    if not all(
+                        manifest is not None and manifest.is_current(passage)
+                        for manifest in self.manifests
+                    )
+                ]
+                stats["skipped"] += len(part_of_passages) - len(pending_passages)
+                part_of_passages = pending_passages
+
+                if not part_of_passages:
+                    continue
 
-        for i in range(0, len(passages), 10):
-            passages_and_vectors = [
-                (
-                    passage,
-                    self.vectorizer.get_vector(
+                start = time.perf_counter()
+                vectors = self.vectorizer.get_vectors(
+                    [
                         get_query_with_prefix(passage.context, self.prefix)
-                    ),
+                        for passage in part_of_passages
+                    ],
+                    batch_size=self.batch_size,
                 )
-                for passage in passages[i : i + 10]
-            ]
+                stats["embedding_time"] += time.perf_counter() - start
+                stats["embedded"] += len(part_of_passages)
+
+                passages_and_vectors = list(zip(part_of_passages, vectors))
+
+                # Blocks while the uploaders are behind
+                for passage_queue in queues:
+                    passage_queue.put(passages_and_vectors)
+
+                print(f"Embedded {stats['embedded']} passages")
+        except Exception as e:
+            errors.append(e)
+        finally:
+            for passage_queue in queues:
+                passage_queue.put(END_OF_STREAM)
+
+    def _iterate_queue(
+        self,
+        passage_queue: queue.Queue,
+        manifest: IngestionManifest,
+        counter: list,
+    ):
+        while True:
+            passages_and_vectors = passage_queue.get()
+
+            if passages_and_vectors is END_OF_STREAM:
+                return
+
+            for passage, vector in passages_and_vectors:
+                if manifest is not None and manifest.is_current(passage):
+                    continue
+
+                counter[0] += 1
+                yield passage, vector
+
+    def _upload(
+        self,
+        repository: QdrantRepository,
+        passage_queue: queue.Queue,
+        manifest: IngestionManifest,
+        stats: dict,
+        errors: list,
+    ):
+        start = time.perf_counter()
+        counter = [0]
+        stream = self._iterate_queue(passage_queue, manifest, counter)
+
+        try:
+            # Only passages upload_points has sent are marked as imported
+            repository.upload_many_with_vectors(
+                stream,
+                self.upload_batch_size,
+                self.upload_parallel,
+                manifest.mark if manifest is not None else None,
+            )
+        except Exception as e:
+            errors.append(e)
+            # Keep draining so the embedding thread is never blocked forever
+            for _ in self._iterate_queue(passage_queue, None, [0]):
+                pass
+
+        if manifest is not None:
+            manifest.save()
+
+        stats[repository.collection_name] = (counter[0], time.perf_counter() - start)
+
+    def import_data(self):
+        start = time.perf_counter()
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.repositories]
+        stats = {"embedded": 0, "skipped": 0, "embedding_time": 0.0}
+        upload_stats = {}
+        errors = []
+
+        threads = [threading.Thread(target=self._embed, args=(queues, stats, errors))]
+        threads += [
+            threading.Thread(
+                target=self._upload,
+                args=(repository, passage_queue, manifest, upload_stats, errors),
+            )
+            for repository, passage_queue, manifest in zip(
+                self.repositories, queues, self.manifests
+            )
+        ]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            raise errors[0]
+
+        for repository in self.repositories:
+            repository.wait_until_ready()
 
-            self.repository.insert_many_with_vectors(passages_and_vectors)
-            print(f"Processed {i+10} passages")
+        embedding_rate = (
+            stats["embedded"] / stats["embedding_time"]
+            if stats["embedding_time"] > 0
+            else 0
+        )
+        print(
+            f"Embedded {stats['embedded']} passages at {embedding_rate:.1f} passages/sec"
+        )
+        print(f"Skipped {stats['skipped']} passages already imported")
+        for collection_name, (count, elapsed) in upload_stats.items():
+            upload_rate = count / elapsed if elapsed > 0 else 0
+            print(
+                f"Uploaded {count} points to {collection_name} at {upload_rate:.1f} points/sec"
+            )
+        print(f"Import finished in {time.perf_counter() - start:.1f}s")
@@ -9,28 +9,25 @@ class QdrantOpenAIDataImporter:
         self,
         repository: QdrantRepository,
         passage_factory: PassageFactory,
+        batch_size: int = 10,
     ):
         self.repository = repository
         self.passage_factory = passage_factory
+        self.batch_size = batch_size
 
     def import_data(self, batch):
-        passages = self.passage_factory.get_passages()
+        embeddings = {
+            obj["custom_id"]: obj["response"]["body"]["data"][0]["embedding"]
+            for obj in batch
+        }
 
-        for i in range(0, len(passages), 10):
+        processed = 0
+        for part_of_passages in self.passage_factory.iter_batches(self.batch_size):
             passages_and_vectors = [
-                (
-                    passage,
-                    next(
-                        (
-                            obj
-                            for obj in batch
-                            if obj["custom_id"] == f"{passage.id}-{passage.start_index}"
-                        ),
-                        None,
-                    )["response"]["body"]["data"][0]["embedding"],
-                )
-                for passage in passages[i : i + 10]
+                (passage, embeddings[f"{passage.id}-{passage.start_index}"])
+                for passage in part_of_passages
             ]
 
             self.repository.insert_many_with_vectors(passages_and_vectors)
-            print(f"Processed {i+10} passages")
+            processed += len(part_of_passages)
+            print(f"Processed {processed} passages")
@@ -0,0 +1,69 @@
+import json
+import os
+from collections import Counter
+from typing import Dict
+from common.passage_store import PassageStore
+
+
+# Number of chunks per (dataset_key, passage id), which is the recall
+# denominator. It only depends on the chunking, so it is computed from the
+# passage store instead of asking the search backends for every question.
+class RelevanceCountIndex:
+    def __init__(self, store: PassageStore):
+        self.store = store
+        self.counts: Dict[str, Dict[str, int]] = {}
+
+    def get_path(self, dataset_key: str) -> str:
+        return os.path.join(self.store.directory, f"{dataset_key}.counts.json")
+
+    def build(self, dataset_key: str) -> Dict[str, int]:
+        counts = dict(
+            Counter(passage.id for passage in self.store.iter_passages(dataset_key))
+        )
+
+        path = self.get_path(dataset_key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(counts, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        self.counts[dataset_key] = counts
+
+        return counts
+
+    def load(self, dataset_key: str) -> Dict[str, int]:
+        if dataset_key in self.counts:
+            return self.counts[dataset_key]
+
+        path = self.get_path(dataset_key)
+
+        # A rebuilt passage store makes the saved counts stale
+        is_stale = (
+            self.store.has(dataset_key)
+            and os.path.isfile(path)
+            and (
+                os.path.getmtime(path)
+                < os.path.getmtime(self.store.get_path(dataset_key))
+            )
+        )
+
+        if os.path.isfile(path) and not is_stale:
+            with open(path, "r", encoding="utf-8") as f:
+                self.counts[dataset_key] = json.load(f)
+            return self.counts[dataset_key]
+
+        # Stores written before the index existed or rebuilt since
+        if self.store.has(dataset_key):
+            return self.build(dataset_key)
+
+        return None
+
+    # None when the dataset key or passage id is not indexed, so callers fall
+    # back to asking the search backend
+    def count(self, passage_id: str, dataset_key: str) -> int:
+        counts = self.load(dataset_key)
+
+        if counts is None:
+            return None
+
+        return counts.get(passage_id)
@@ -1,8 +1,39 @@
-from typing import List, Tuple
+import json
+from typing import Dict, List, Tuple
 from common.passage import Passage
 
 
 class Result:
-    def __init__(self, query: str, passages: List[Tuple[Passage, float]]) -> None:
+    def __init__(
+        self,
+        query: str,
+        passages: List[Tuple[Passage, float]],
+        timings: Dict[str, float] = None,
+    ) -> None:
         self.query = query
         self.passages = passages
+        self.timings = timings or {}
+
+
+def passages_to_json(passages: List[Tuple[Passage, float]]) -> str:
+    return json.dumps([{"passage": p.dict(), "score": s} for (p, s) in passages])
+
+
+def passages_from_json(value: str) -> List[Tuple[Passage, float]]:
+    return [(Passage.from_dict(d["passage"]), d["score"]) for d in json.loads(value)]
+
+
+def normalize_scores(
+    passages: List[Tuple[Passage, float]],
+) -> List[Tuple[Passage, float]]:
+    if not passages:
+        return []
+
+    max_score = passages[0][1]
+    min_score = passages[-1][1]
+    score_diff = max_score - min_score
+
+    return [
+        (passage, 1 if score_diff == 0 else (score - min_score) / score_diff)
+        for passage, score in passages
+    ]
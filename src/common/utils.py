@@ -1,3 +1,4 @@
+import json
 import string
 import uuid
 from common.names import (
@@ -26,6 +27,25 @@ def generate_id():
     return str(uuid.uuid4())
 
 
+POINT_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "polish-nl-qa/passages")
+
+
+def get_point_id(dataset_key: str, passage_id: str, start_index: int):
+    return str(
+        uuid.uuid5(POINT_ID_NAMESPACE, f"{dataset_key}:{passage_id}:{start_index}")
+    )
+
+
+def get_passage_point_id(passage: Passage):
+    return get_point_id(passage.dataset_key, passage.id, passage.start_index)
+
+
+def get_passage_content_hash(passage: Passage):
+    return hashlib.sha256(
+        json.dumps(passage.dict(), sort_keys=True, ensure_ascii=False).encode()
+    ).hexdigest()
+
+
 def replace_slash_with_dash(text: str):
     return text.replace("/", "-")
 
@@ -42,29 +62,13 @@ def get_vectorizer_hash(model: str, prompt: str):
     return "vectorizer:" + hashed
 
 
-def get_prompt_hash(
-    model: str, dataset_key: str, prompt: str, distance: str, size: int
+def get_reranker_score_hash(
+    model: str, query: str, passage_id: str, dataset_key: str, start_index: int
 ):
-    hashed = hashlib.sha256(
-        (model + dataset_key + prompt + distance + str(size)).encode()
-    ).hexdigest()
-    return "prompt:" + hashed
-
-
-def get_es_query_hash(index_name: str, dataset_key: str, query: str, size: int):
-    hashed = hashlib.sha256(
-        (index_name + dataset_key + query + str(size)).encode()
-    ).hexdigest()
-    return "query:" + hashed
-
-
-def get_reranker_hash(
-    model: str, query: str, passage_ids: list, dataset_key: str, count: int
-):
-    hashed = hashlib.sha256(
-        (model + query + str(passage_ids) + dataset_key + str(count)).encode()
-    ).hexdigest()
-    return "reranker:" + hashed
+    # JSON keeps field boundaries, plain concatenation does not
+    fields = [model, query, passage_id, dataset_key, start_index]
+    hashed = hashlib.sha256(json.dumps(fields).encode()).hexdigest()
+    return "reranker_score:v2:" + hashed
 
 
 def get_relevant_document_count_hash(passage_id: str, dataset_key: str):
@@ -77,9 +81,12 @@ def get_generator_hash(query: str, context: str, type: str, model: str):
     return "generator:" + hashed
 
 
-def get_faithfulness_hash(answer: str, context: str):
+def get_faithfulness_hash(answer: str, context: str, top_m: int = None):
     hashed = hashlib.sha256((answer + context).encode()).hexdigest()
-    return "faithfulness_v2:" + hashed
+    # v3 splits the context per passage, v2 scores are not comparable
+    if top_m is None:
+        return "faithfulness_v3:" + hashed
+    return f"faithfulness_v3:top_{top_m}:" + hashed
 
 
 def get_answer_relevance_hash(original_question: str, answer: str):
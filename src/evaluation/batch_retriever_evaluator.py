@@ -0,0 +1,158 @@
+from typing import Dict, List
+import numpy as np
+
+from common.relevance_count_index import RelevanceCountIndex
+from common.result import Result
+
+# Every metric is returned as a (queries x k) array, column j holds the
+# metric at cutoff j + 1
+
+
+def get_relevance_matrix(
+    results: List[Result], correct_passage_ids: List[str], k: int = None
+) -> np.ndarray:
+    if k is None:
+        k = max((len(result.passages) for result in results), default=0)
+
+    # Queries without passages still get one all-zero column
+    relevances = np.zeros((len(results), max(k, 1)), dtype=np.float64)
+
+    for i, (result, correct_passage_id) in enumerate(zip(results, correct_passage_ids)):
+        for j, (passage, _) in enumerate(result.passages[:k]):
+            if passage.id == correct_passage_id:
+                relevances[i, j] = 1
+
+    return relevances
+
+
+def get_discounts(k: int) -> np.ndarray:
+    return 1 / np.log2(np.arange(k) + 2)
+
+
+# The ideal ranking puts the relevant passages found in the top k first, same
+# as the per result NDCG
+def ndcg_at_k(relevances: np.ndarray) -> np.ndarray:
+    discounts = get_discounts(relevances.shape[1])
+    dcg = np.cumsum(relevances * discounts, axis=1)
+
+    hits = np.cumsum(relevances, axis=1).astype(np.int64)
+    ideal_dcg = np.concatenate([[0.0], np.cumsum(discounts)])[hits]
+
+    return np.divide(dcg, ideal_dcg, out=np.zeros_like(dcg), where=ideal_dcg > 0)
+
+
+def mrr_at_k(relevances: np.ndarray) -> np.ndarray:
+    is_relevant = relevances > 0
+    first_rank = np.argmax(is_relevant, axis=1)
+    reciprocal_rank = np.where(is_relevant.any(axis=1), 1 / (first_rank + 1), 0.0)
+
+    found = first_rank[:, None] <= np.arange(relevances.shape[1])[None, :]
+
+    return np.where(found, reciprocal_rank[:, None], 0.0)
+
+
+def hit_at_k(relevances: np.ndarray) -> np.ndarray:
+    return (np.cumsum(relevances, axis=1) > 0).astype(np.float64)
+
+
+def recall_at_k(relevances: np.ndarray, relevant_counts: np.ndarray) -> np.ndarray:
+    hits = np.cumsum(relevances, axis=1)
+    counts = np.asarray(relevant_counts, dtype=np.float64)[:, None]
+
+    return np.divide(
+        hits,
+        counts,
+        out=np.zeros_like(hits),
+        where=np.broadcast_to(counts > 0, hits.shape),
+    )
+
+
+def context_precision_at_k(relevances: np.ndarray) -> np.ndarray:
+    hits = np.cumsum(relevances, axis=1)
+    precisions = hits / np.arange(1, relevances.shape[1] + 1)
+    precisions_sum = np.cumsum(precisions * relevances, axis=1)
+
+    return np.divide(precisions_sum, hits, out=np.zeros_like(hits), where=hits > 0)
+
+
+class BatchRetrieverEvaluator:
+    def __init__(
+        self,
+        relevance_counts: RelevanceCountIndex = None,
+        bootstrap_samples: int = 1000,
+        confidence: float = 0.95,
+        seed: int = None,
+    ):
+        self.relevance_counts = relevance_counts
+        self.bootstrap_samples = bootstrap_samples
+        self.confidence = confidence
+        self.seed = seed
+
+    def evaluate(
+        self, relevances: np.ndarray, relevant_counts: np.ndarray = None
+    ) -> Dict[str, np.ndarray]:
+        metrics = {
+            "ndcg": ndcg_at_k(relevances),
+            "mrr": mrr_at_k(relevances),
+            "hit": hit_at_k(relevances),
+            "context_precision": context_precision_at_k(relevances),
+        }
+
+        if relevant_counts is not None:
+            metrics["recall"] = recall_at_k(relevances, relevant_counts)
+
+        return metrics
+
+    # Mean of every metric at every cutoff with a percentile bootstrap
+    # confidence interval over queries
+    def summarize(self, metrics: Dict[str, np.ndarray]) -> Dict[str, dict]:
+        rng = np.random.default_rng(self.seed)
+        alpha = (1 - self.confidence) / 2
+
+        summary = {}
+        for name, values in metrics.items():
+            query_count = values.shape[0]
+            samples = rng.integers(
+                0, query_count, (self.bootstrap_samples, query_count)
+            )
+            sample_means = values[samples].mean(axis=1)
+
+            summary[name] = {
+                "mean": values.mean(axis=0),
+                "ci_low": np.quantile(sample_means, alpha, axis=0),
+                "ci_high": np.quantile(sample_means, 1 - alpha, axis=0),
+            }
+
+        return summary
+
+    def evaluate_results(
+        self,
+        results: List[Result],
+        correct_passage_ids: List[str],
+        dataset_key: str = None,
+        k: int = None,
+    ) -> Dict[str, dict]:
+        relevances = get_relevance_matrix(results, correct_passage_ids, k)
+
+        relevant_counts = None
+        if self.relevance_counts is not None and dataset_key is not None:
+            relevant_counts = [
+                self.relevance_counts.count(passage_id, dataset_key)
+                for passage_id in correct_passage_ids
+            ]
+
+            # An unknown passage would silently get a recall of 0
+            unknown = [
+                passage_id
+                for passage_id, count in zip(correct_passage_ids, relevant_counts)
+                if count is None
+            ]
+            if unknown:
+                raise ValueError(
+                    f"Passages {', '.join(unknown)} are not in the relevance "
+                    f"counts of {dataset_key}"
+                )
+
+            relevant_counts = np.array(relevant_counts)
+
+        return self.summarize(self.evaluate(relevances, relevant_counts))
@@ -1,7 +1,12 @@
-from sentence_transformers import CrossEncoder
 from cache.cache import Cache
+from common.device import resolve_device
+from common.model_registry import CROSS_ENCODER, get_model_registry
 from common.models_dimensions import RERANKER_MODEL_DIMENSIONS_MAP
 from common.result import Result
+from evaluation.batch_retriever_evaluator import (
+    context_precision_at_k,
+    get_relevance_matrix,
+)
 import nltk
 from nltk.tokenize import sent_tokenize
 import ssl
@@ -32,9 +37,14 @@ class RAGASEvaluator:
         nltk.download("punkt")
 
         self.raranker_model_name = reranker_model_name
-        self.raranker_model = CrossEncoder(
+        # Shared with an HFReranker of the same model
+        registry = get_model_registry()
+        self.raranker_model, self._release_raranker_model = registry.acquire(
+            self,
+            CROSS_ENCODER,
             reranker_model_name,
-            max_length=RERANKER_MODEL_DIMENSIONS_MAP[reranker_model_name],
+            resolve_device(),
+            RERANKER_MODEL_DIMENSIONS_MAP[reranker_model_name],
         )
         model, tokenizer = load(generator_model_name)
         self.generator_model = model
@@ -44,33 +54,9 @@ class RAGASEvaluator:
         pass
 
     def context_precision(self, result: Result, correct_passage_id: str) -> float:
+        relevances = get_relevance_matrix([result], [correct_passage_id])
 
-        precisions_sum = 0
-
-        for i in range(1, len(result.passages) + 1):
-            sub_precision = 0
-
-            for j in range(0, i):
-                if result.passages[j][0].id == correct_passage_id:
-                    sub_precision += 1
-
-            relevant_at_i = (
-                1 if result.passages[i - 1][0].id == correct_passage_id else 0
-            )
-
-            precisions_sum += (sub_precision / i) * relevant_at_i
-
-        sum_of_relevant_passages = sum(
-            [1 for passage in result.passages if passage[0].id == correct_passage_id]
-        )
-
-        value = (
-            precisions_sum / sum_of_relevant_passages
-            if sum_of_relevant_passages > 0
-            else 0
-        )
-
-        return value
+        return float(context_precision_at_k(relevances)[0, -1])
 
     def context_recall(self, result: Result, correct_passage_id: str) -> float:
         is_any_relevant = False
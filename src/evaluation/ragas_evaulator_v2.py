@@ -1,10 +1,17 @@
-from sentence_transformers import CrossEncoder
 from cache.cache import Cache
+from common.device import resolve_device
+from common.model_registry import CROSS_ENCODER, get_model_registry
 from common.models_dimensions import RERANKER_MODEL_DIMENSIONS_MAP
+from common.passage import Passage
 from common.result import Result
+from evaluation.batch_retriever_evaluator import (
+    context_precision_at_k,
+    get_relevance_matrix,
+)
 import nltk
 from nltk.tokenize import sent_tokenize
 import ssl
+from typing import List
 from mlx_lm import load, generate
 from common.utils import (
     get_answer_relevance_hash,
@@ -13,6 +20,58 @@ from common.utils import (
 )
 from vectorizer.vectorizer import Vectorizer
 import numpy as np
+import torch
+
+try:
+    from mlx_lm import batch_generate
+except ImportError:
+    # Older mlx_lm versions only generate one prompt at a time
+    batch_generate = None
+
+ANSWER_RELEVANCE_MAX_TOKENS = 300
+GENERATION_BATCH_SIZE = 16
+
+
+def get_answer_relevance_prompt(answer: str) -> str:
+    # Improved prompt with better instructions
+    return f"""Wygeneruj dokładnie 3 pytania, na które podany tekst mógłby być odpowiedzią. Pytania powinny być konkretne i istotne.
+
+Tekst: {answer.replace("\n", " ")}
+
+Wygeneruj pytania w formacie:
+1. [pytanie]
+2. [pytanie]
+3. [pytanie]
+
+Pytania:"""
+
+
+def parse_generated_questions(generated_questions: str) -> List[str]:
+    # More robust parsing
+    questions = []
+    for line in generated_questions.split("\n"):
+        line = line.strip()
+        # Look for lines starting with 1., 2., or 3.
+        if line and len(line) > 3:
+            if line.startswith("1.") or line.startswith("2.") or line.startswith("3."):
+                # Remove the number prefix
+                question = line[2:].strip()
+                if len(question) > 5:  # Minimum length filter
+                    questions.append(question)
+
+    # If we couldn't parse 3 questions, try alternative format
+    if len(questions) < 3:
+        questions = []
+        lines = [l.strip() for l in generated_questions.split("\n") if l.strip()]
+        for line in lines[:3]:  # Take first 3 non-empty lines
+            # Remove common prefixes
+            for prefix in ["1.", "2.", "3.", "1)", "2)", "3)", "-", "*"]:
+                if line.startswith(prefix):
+                    line = line[len(prefix) :].strip()
+            if len(line) > 5:
+                questions.append(line)
+
+    return questions[:3]  # Use at most 3 questions
 
 
 class RAGASEvaluatorV2:
@@ -22,7 +81,19 @@ class RAGASEvaluatorV2:
         cache: Cache,
         generator_model_name: str,
         vectorizer: Vectorizer,
+        faithfulness_top_m: int = None,
     ):
+        # torch.topk and np.maximum.reduceat need at least one candidate
+        if faithfulness_top_m is not None and (
+            not isinstance(faithfulness_top_m, int)
+            or isinstance(faithfulness_top_m, bool)
+            or faithfulness_top_m < 1
+        ):
+            raise ValueError(
+                f"faithfulness_top_m must be None or a positive int, "
+                f"got {faithfulness_top_m!r}"
+            )
+
         try:
             _create_unverified_https_context = ssl._create_unverified_context
         except AttributeError:
@@ -33,44 +104,31 @@ class RAGASEvaluatorV2:
         nltk.download("punkt", quiet=True)
 
         self.reranker_model_name = reranker_model_name
-        self.reranker_model = CrossEncoder(
+        # Shared with an HFReranker of the same model
+        registry = get_model_registry()
+        self.reranker_model, self._release_reranker_model = registry.acquire(
+            self,
+            CROSS_ENCODER,
             reranker_model_name,
-            max_length=RERANKER_MODEL_DIMENSIONS_MAP[reranker_model_name],
+            resolve_device(),
+            RERANKER_MODEL_DIMENSIONS_MAP[reranker_model_name],
         )
         model, tokenizer = load(generator_model_name)
         self.generator_model = model
         self.generator_tokenizer = tokenizer
         self.cache = cache
         self.vectorizer = vectorizer
+        # Cross-encodes only this many most similar context sentences per
+        # answer sentence, all of them when None
+        self.faithfulness_top_m = faithfulness_top_m
+        # Sentence splits of every passage seen, by passage chunk
+        self.passage_sentences = {}
 
     def context_precision(self, result: Result, correct_passage_id: str) -> float:
         """Unchanged - measures if relevant passage appears early"""
-        precisions_sum = 0
+        relevances = get_relevance_matrix([result], [correct_passage_id])
 
-        for i in range(1, len(result.passages) + 1):
-            sub_precision = 0
-
-            for j in range(0, i):
-                if result.passages[j][0].id == correct_passage_id:
-                    sub_precision += 1
-
-            relevant_at_i = (
-                1 if result.passages[i - 1][0].id == correct_passage_id else 0
-            )
-
-            precisions_sum += (sub_precision / i) * relevant_at_i
-
-        sum_of_relevant_passages = sum(
-            [1 for passage in result.passages if passage[0].id == correct_passage_id]
-        )
-
-        value = (
-            precisions_sum / sum_of_relevant_passages
-            if sum_of_relevant_passages > 0
-            else 0
-        )
-
-        return value
+        return float(context_precision_at_k(relevances)[0, -1])
 
     def context_recall(self, result: Result, correct_passage_id: str) -> float:
         """Unchanged - binary check if correct passage is retrieved"""
@@ -83,6 +141,31 @@ class RAGASEvaluatorV2:
 
         return 1 if is_any_relevant else 0
 
+    def get_passage_sentences(self, passage: Passage) -> List[str]:
+        key = (passage.id, passage.dataset_key, passage.start_index)
+
+        if key not in self.passage_sentences:
+            self.passage_sentences[key] = sent_tokenize(passage.context)
+
+        return self.passage_sentences[key]
+
+    # Indices of the top m context sentences by embedding similarity for every
+    # answer sentence
+    def get_faithfulness_candidates(
+        self, sentences: List[str], context_sentences: List[str]
+    ) -> List[List[int]]:
+        if len(context_sentences) <= self.faithfulness_top_m:
+            return [list(range(len(context_sentences)))] * len(sentences)
+
+        vectors = self.vectorizer.get_vectors(sentences + context_sentences)
+        similarities = self.vectorizer.get_similarity(
+            torch.stack(vectors[: len(sentences)]),
+            torch.stack(vectors[len(sentences) :]),
+        )
+        candidates = torch.topk(similarities, self.faithfulness_top_m, dim=1).indices
+
+        return candidates.tolist()
+
     def faithfulness(self, result: Result, answer: str) -> float:
         """
         IMPROVED: Uses continuous scores instead of binary threshold
@@ -92,39 +175,48 @@ class RAGASEvaluatorV2:
         if not answer or not answer.strip():
             return 0.0
 
-        sentences = sent_tokenize(answer)
-        if not sentences:
-            return 0.0
-
         context = " ".join([passage[0].context for passage in result.passages])
-        context_sentences = sent_tokenize(context)
 
-        if not context_sentences:
-            return 0.0
-
-        hash_key = get_faithfulness_hash(answer, context)
+        hash_key = get_faithfulness_hash(answer, context, self.faithfulness_top_m)
         maybe_faithfulness = self.cache.get(hash_key)
 
         if maybe_faithfulness:
             return float(maybe_faithfulness)
 
-        # For each answer sentence, find max similarity with context sentences
-        faithfulness_scores = []
-        for sentence in sentences:
-            if not sentence.strip():
-                continue
+        sentences = [sentence for sentence in sent_tokenize(answer) if sentence.strip()]
+        if not sentences:
+            return 0.0
 
-            pairs = [[sentence, context_sent] for context_sent in context_sentences]
-            scores = self.reranker_model.predict(pairs)
+        context_sentences = [
+            context_sentence
+            for passage in result.passages
+            for context_sentence in self.get_passage_sentences(passage[0])
+        ]
 
-            # Use max score (best match) and apply sigmoid-like transformation
-            max_score = float(np.max(scores))
-            # Transform score to 0-1 range with more gradual transition
-            # Scores > 0 become > 0.5, scores < 0 become < 0.5
-            normalized_score = 1 / (1 + np.exp(-5 * max_score))
-            faithfulness_scores.append(normalized_score)
+        if not context_sentences:
+            return 0.0
 
-        faithfulness = np.mean(faithfulness_scores) if faithfulness_scores else 0.0
+        if self.faithfulness_top_m is None:
+            candidates = [list(range(len(context_sentences)))] * len(sentences)
+        else:
+            candidates = self.get_faithfulness_candidates(sentences, context_sentences)
+
+        # Every answer sentence against its context sentences in one predict
+        pairs = [
+            [sentence, context_sentences[j]]
+            for sentence, indices in zip(sentences, candidates)
+            for j in indices
+        ]
+        scores = np.asarray(self.reranker_model.predict(pairs), dtype=np.float64)
+        offsets = np.cumsum([0] + [len(indices) for indices in candidates[:-1]])
+
+        # Use max score (best match) and apply sigmoid-like transformation
+        max_scores = np.maximum.reduceat(scores, offsets)
+        # Transform score to 0-1 range with more gradual transition
+        # Scores > 0 become > 0.5, scores < 0 become < 0.5
+        faithfulness_scores = 1 / (1 + np.exp(-5 * max_scores))
+
+        faithfulness = np.mean(faithfulness_scores)
         self.cache.set(hash_key, str(faithfulness))
 
         return float(faithfulness)
@@ -134,83 +226,92 @@ class RAGASEvaluatorV2:
         IMPROVED: Better prompt and more robust parsing
         Generates questions from answer and compares to original
         """
-        # Handle edge cases
-        if not answer or not answer.strip():
-            return 0.0
-
-        hash_key = get_answer_relevance_hash(original_question, answer)
-        maybe_answer_relevance = self.cache.get(hash_key)
-
-        if maybe_answer_relevance:
-            return float(maybe_answer_relevance)
-
-        # Improved prompt with better instructions
-        prompt = f"""Wygeneruj dokładnie 3 pytania, na które podany tekst mógłby być odpowiedzią. Pytania powinny być konkretne i istotne.
+        return self.answer_relevance_batch([original_question], [answer])[0]
+
+    def generate_questions(self, prompts: List[str]) -> List[str]:
+        if batch_generate is None:
+            return [
+                generate(
+                    self.generator_model,
+                    self.generator_tokenizer,
+                    prompt=prompt,
+                    max_tokens=ANSWER_RELEVANCE_MAX_TOKENS,
+                )
+                for prompt in prompts
+            ]
+
+        response = batch_generate(
+            self.generator_model,
+            self.generator_tokenizer,
+            [self.generator_tokenizer.encode(prompt) for prompt in prompts],
+            max_tokens=ANSWER_RELEVANCE_MAX_TOKENS,
+        )
 
-Tekst: {answer.replace("\n", " ")}
+        return response.texts
 
-Wygeneruj pytania w formacie:
-1. [pytanie]
-2. [pytanie]
-3. [pytanie]
+    def answer_relevance_batch(
+        self, original_questions: List[str], answers: List[str]
+    ) -> List[float]:
+        """
+        Answer relevance of many (question, answer) pairs, the generations run
+        batched and all questions are embedded together
+        """
+        scores = [0.0] * len(answers)
 
-Pytania:"""
+        hash_keys = [
+            get_answer_relevance_hash(original_question, answer)
+            for original_question, answer in zip(original_questions, answers)
+        ]
+        cached = self.cache.get_many(hash_keys)
 
-        generated_questions = generate(
-            self.generator_model,
-            self.generator_tokenizer,
-            prompt=prompt,
-            max_tokens=300,
-        )
+        # Handle edge cases
+        pending = []
+        for i, answer in enumerate(answers):
+            if not answer or not answer.strip():
+                continue
+            if hash_keys[i] in cached:
+                scores[i] = float(cached[hash_keys[i]])
+                continue
+            pending.append(i)
+
+        generated = []
+        for j in range(0, len(pending), GENERATION_BATCH_SIZE):
+            generated += self.generate_questions(
+                [
+                    get_answer_relevance_prompt(answers[i])
+                    for i in pending[j : j + GENERATION_BATCH_SIZE]
+                ]
+            )
 
-        # More robust parsing
-        questions = []
-        for line in generated_questions.split("\n"):
-            line = line.strip()
-            # Look for lines starting with 1., 2., or 3.
-            if line and len(line) > 3:
-                if (
-                    line.startswith("1.")
-                    or line.startswith("2.")
-                    or line.startswith("3.")
-                ):
-                    # Remove the number prefix
-                    question = line[2:].strip()
-                    if len(question) > 5:  # Minimum length filter
-                        questions.append(question)
-
-        # If we couldn't parse 3 questions, try alternative format
-        if len(questions) < 3:
-            questions = []
-            lines = [l.strip() for l in generated_questions.split("\n") if l.strip()]
-            for line in lines[:3]:  # Take first 3 non-empty lines
-                # Remove common prefixes
-                for prefix in ["1.", "2.", "3.", "1)", "2)", "3)", "-", "*"]:
-                    if line.startswith(prefix):
-                        line = line[len(prefix) :].strip()
-                if len(line) > 5:
-                    questions.append(line)
+        questions = {}
+        for i, generated_questions in zip(pending, generated):
+            parsed = parse_generated_questions(generated_questions)
+            if parsed:
+                questions[i] = parsed
 
         if not questions:
-            return 0.0
+            return scores
 
         # Calculate similarity between original and generated questions
-        original_question_vector = self.vectorizer.get_vector(
-            f"zapytanie: {original_question}"
+        indices = list(questions)
+        owners = np.array([k for k, i in enumerate(indices) for _ in questions[i]])
+        vectors = self.vectorizer.get_vectors(
+            [f"zapytanie: {original_questions[i]}" for i in indices]
+            + [f"zapytanie: {q}" for i in indices for q in questions[i]]
         )
 
-        similarities = []
-        for q in questions[:3]:  # Use at most 3 questions
-            q_vector = self.vectorizer.get_vector(f"zapytanie: {q}")
-            similarity = self.vectorizer.get_similarity(
-                original_question_vector, q_vector
-            ).item()
-            similarities.append(similarity)
+        similarities = self.vectorizer.get_similarity(
+            torch.stack(vectors[: len(indices)]),
+            torch.stack(vectors[len(indices) :]),
+        )
+        similarities = similarities.cpu().numpy()[owners, np.arange(len(owners))]
+        means = np.bincount(owners, similarities) / np.bincount(owners)
 
-        score = np.mean(similarities) if similarities else 0.0
-        self.cache.set(hash_key, str(score))
+        for i, score in zip(indices, means):
+            scores[i] = float(score)
+        self.cache.set_many({hash_keys[i]: str(scores[i]) for i in indices})
 
-        return float(score)
+        return scores
 
     def query_to_context_relevance(self, result: Result) -> float:
         """
@@ -1,47 +1,63 @@
-from ast import List
-import math
-
-from common.passage import Passage
+from common.relevance_count_index import RelevanceCountIndex
 from common.result import Result
+from evaluation.batch_retriever_evaluator import (
+    get_relevance_matrix,
+    hit_at_k,
+    mrr_at_k,
+    ndcg_at_k,
+    recall_at_k,
+)
 
 
+# Single result metrics, use BatchRetrieverEvaluator for whole sweeps
 class RetrieverEvaluator:
+    def __init__(self, relevance_counts: RelevanceCountIndex = None):
+        self.relevance_counts = relevance_counts
+
     # Calculate NDCG for top 10 results
     def calculate_ndcg(self, result: Result, correct_passage_id: str) -> float:
-        relevances = [
-            1 if passage.id == correct_passage_id else 0
-            for (passage, _) in result.passages
-        ]
-
-        sorted_relevances = sorted(relevances, reverse=True)
-
-        dcg = sum((rel / math.log(i + 2, 2)) for i, rel in enumerate(relevances))
-        idcg = sum(
-            (rel / math.log(i + 2, 2)) for i, rel in enumerate(sorted_relevances)
-        )
+        relevances = get_relevance_matrix([result], [correct_passage_id])
 
-        return dcg / idcg if idcg != 0 else 0
+        return float(ndcg_at_k(relevances)[0, -1])
 
     # Calculate MRR for top 10 results
     def calculate_mrr(self, result: Result, correct_passage_id: str) -> float:
-        for i, (passage, _) in enumerate(result.passages):
-            if passage.id == correct_passage_id:
-                return 1 / (i + 1)
-        return 0
+        relevances = get_relevance_matrix([result], [correct_passage_id])
 
-    # Calculate recall for top 10 results
+        return float(mrr_at_k(relevances)[0, -1])
+
+    # Calculate recall for top 10 results, the relevant documents count comes
+    # from the relevance count index when it is not given
     def calculate_recall(
-        self, result: Result, correct_passage_id: str, relevant_documents_count: int
+        self,
+        result: Result,
+        correct_passage_id: str,
+        relevant_documents_count: int = None,
+        dataset_key: str = None,
     ) -> float:
-        relevant_documents = sum(
-            1 for (passage, _) in result.passages if passage.id == correct_passage_id
-        )
+        if relevant_documents_count is None:
+            if self.relevance_counts is None:
+                raise ValueError(
+                    "calculate_recall needs relevant_documents_count or a "
+                    "RetrieverEvaluator created with relevance_counts"
+                )
+
+            relevant_documents_count = self.relevance_counts.count(
+                correct_passage_id, dataset_key
+            )
+
+            if relevant_documents_count is None:
+                raise ValueError(
+                    f"Passage {correct_passage_id} is not in the relevance "
+                    f"counts of {dataset_key}, pass relevant_documents_count"
+                )
+
+        relevances = get_relevance_matrix([result], [correct_passage_id])
 
-        return relevant_documents / relevant_documents_count
+        return float(recall_at_k(relevances, [relevant_documents_count])[0, -1])
 
     # Calculate accuracy for top 1 result
     def calculate_accuracy(self, result: Result, correct_passage_id: str) -> float:
-        if len(result.passages) == 0:
-            return 0
+        relevances = get_relevance_matrix([result], [correct_passage_id], 1)
 
-        return 1 if result.passages[0][0].id == correct_passage_id else 0
+        return float(hit_at_k(relevances)[0, 0])
@@ -1,4 +1,5 @@
 from cache.cache import Cache
+from common.device import resolve_device
 from common.passage import Passage
 from transformers import pipeline, AutoTokenizer
 from common.utils import (
@@ -13,13 +14,14 @@ MAX_LENGTH = 512
 
 
 class QuestionAnsweringGenerator(Generator):
-    def __init__(self, model_name: str, cache: Cache):
+    def __init__(self, model_name: str, cache: Cache, device: str = None):
         self.model_name = model_name
+        self.device = resolve_device(device)
 
         self.pipeline = pipeline(
             "question-answering",
             model=model_name,
-            device="mps",
+            device=self.device,
         )
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
         self.cache = cache
@@ -63,14 +63,15 @@ def get_batch_file(qdrantClient: QdrantClient, cache: Cache):
         )
         
         dataset = poquad_dataset if "poquad" in dataset_key else polqa_dataset
-        for entry in dataset:
+        results = retriever.get_relevant_passages_batch(
+            [entry.question for entry in dataset]
+        )
+        for entry, result in zip(dataset, results):
             filename = replace_slash_with_dash(
                 f"{"gpt-4o-mini"}_{dataset_key}.jsonl"
             )
             file_path = f"output/batches/{filename}"
             
-            result = retriever.get_relevant_passages(entry.question)
-            
             ns = [1, 3, 5, 10]
             
             for n in ns:
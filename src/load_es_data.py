@@ -1,16 +1,13 @@
+from concurrent.futures import ThreadPoolExecutor
 from elasticsearch import Elasticsearch
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from cache.cache import Cache
 from common.es_data_importer import ESDataImporter
-from common.names import (
-    CHUNK_SIZES,
-    DATASET_NAMES,
-    INDEX_NAMES,
-)
-from common.passage_factory import PassageFactory
-from dataset.poquad_dataset_getter import PoquadDatasetGetter
+from common.names import INDEX_NAMES
+from common.passage_ingestion import build_passage_store
+from common.passage_store import PassageStore, StoredPassages
 from repository.es_repository import ESRepository
-from dataset.polqa_dataset_getter import PolqaDatasetGetter
+
+BULK_THREAD_COUNT = 2
 
 
 def main():
@@ -18,39 +15,41 @@ def main():
         hosts=["http://localhost:9200"],
     )
     cache = Cache()
+    store = PassageStore()
 
-    for index_name in INDEX_NAMES:
-        insert_passage_data(client, index_name, cache)
+    dataset_keys = build_passage_store(store)
 
+    # Every analyzer gets its own index, so all of them can be loaded at once
+    with ThreadPoolExecutor(max_workers=len(INDEX_NAMES)) as executor:
+        futures = [
+            executor.submit(
+                insert_passage_data, client, index_name, cache, store, dataset_keys
+            )
+            for index_name in INDEX_NAMES
+        ]
 
-def get_passage_factory(
-    chunk_size: int, chunk_overlap: int, dataset_name: str
-) -> PassageFactory:
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size, chunk_overlap=chunk_overlap, strip_whitespace=True
-    )
-
-    dataset_getter = (
-        dataset_name == "ipipan/polqa" and PolqaDatasetGetter() or PoquadDatasetGetter()
-    )
-    return PassageFactory(text_splitter, dataset_getter)
+        for future in futures:
+            future.result()
 
 
 def insert_passage_data(
     client: Elasticsearch,
     index_name: str,
     cache: Cache,
+    store: PassageStore,
+    dataset_keys: list[str],
 ):
-    for dataset_name in DATASET_NAMES:
-        for chunk_size, chunk_overlap in CHUNK_SIZES:
-            passage_factory = get_passage_factory(
-                chunk_size, chunk_overlap, dataset_name
+    repository = ESRepository(client, index_name, cache)
+
+    with repository.bulk_load_settings():
+        for dataset_key in dataset_keys:
+            data_importer = ESDataImporter(
+                repository,
+                StoredPassages(store, dataset_key),
+                parallel=True,
+                thread_count=BULK_THREAD_COUNT,
             )
 
-            repository = ESRepository(client, index_name, cache)
-
-            data_importer = ESDataImporter(repository, passage_factory)
-
             data_importer.import_data()
 
 
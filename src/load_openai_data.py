@@ -19,6 +19,7 @@ from repository.qdrant_openai_repository import QdrantOpenAIRepository
 from qdrant_client import QdrantClient
 from qdrant_client.models import Distance, VectorParams
 from vectorizer.hf_vectorizer import HFVectorizer
+from vectorizer.vector_codec import encode_vector
 from dataset.polqa_dataset_getter import PolqaDatasetGetter
 
 
@@ -122,33 +123,31 @@ def insert_query_cache(cache: Cache):
     poquad_dataset = poquad_dataset_getter.get_test_dataset()
     polqa_dataset = polqa_dataset_getter.get_test_dataset()
 
-    i = 0
-
-    for entry in poquad_dataset:
-        query = entry.question
-        vector = next(
-            (p for p in poquad_batch_data if p["custom_id"] == entry.id), None
-        )["response"]["body"]["data"][0]["embedding"]
-
-        cache.set(
-            get_vectorizer_hash(model_name, query),
-            json.dumps(vector),
+    poquad_vectors = {
+        p["custom_id"]: p["response"]["body"]["data"][0]["embedding"]
+        for p in poquad_batch_data
+    }
+    polqa_vectors = {
+        int(p["custom_id"]): p["response"]["body"]["data"][0]["embedding"]
+        for p in polqa_batch_data
+    }
+
+    items = [
+        (
+            get_vectorizer_hash(model_name, entry.question),
+            encode_vector(poquad_vectors[entry.id]),
         )
-        i += 1
-        print(f"Processed {i} queries")
-
-    for entry in polqa_dataset:
-        query = entry.question
-        vector = next(
-            (p for p in polqa_batch_data if int(p["custom_id"]) == entry.id), None
-        )["response"]["body"]["data"][0]["embedding"]
-
-        cache.set(
-            get_vectorizer_hash(model_name, query),
-            json.dumps(vector),
+        for entry in poquad_dataset
+    ] + [
+        (
+            get_vectorizer_hash(model_name, entry.question),
+            encode_vector(polqa_vectors[entry.id]),
         )
-        i += 1
-        print(f"Processed {i} queries")
+        for entry in polqa_dataset
+    ]
+
+    cache.set_many(items)
+    print(f"Processed {len(items)} queries")
 
 
 main()
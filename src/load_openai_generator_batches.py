@@ -25,7 +25,10 @@ def get_batch_file(cache: Cache):
                 batch_data.append(json.loads(line))
     
 
-        for data in batch_data:
-            cache.set(data["custom_id"], data["response"]["body"]["choices"][0]["message"]["content"])
+        cache.set_many(
+            (data["custom_id"], data["response"]["body"]["choices"][0]["message"]["content"])
+            for data in batch_data
+        )
+        print(f"Loaded {len(batch_data)} answers from {filename}")
 
 main()
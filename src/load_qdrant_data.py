@@ -1,82 +1,92 @@
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from cache.cache import Cache
 from common.models_dimensions import MODEL_DIMENSIONS_MAP
 from common.names import (
-    CHUNK_SIZES,
-    DATASET_NAMES,
     DISTANCES,
     MODEL_NAMES,
     PASSAGE_PREFIX_MAP,
     QUERY_PREFIX_MAP,
 )
-from common.passage_factory import PassageFactory
+from common.ingestion_manifest import IngestionManifest
+from common.passage_ingestion import build_passage_store
+from common.passage_store import PassageStore, StoredPassages
 from common.qdrant_data_importer import QdrantDataImporter
 from common.utils import get_qdrant_collection_name
-from dataset.poquad_dataset_getter import PoquadDatasetGetter
-from repository.qdrant_repository import QdrantRepository
+from repository.collection_profile import get_collection_profile
+from repository.qdrant_repository import SHARED_LAYOUT, QdrantRepository
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams
 from vectorizer.hf_vectorizer import HFVectorizer
-from dataset.polqa_dataset_getter import PolqaDatasetGetter
+
+# PER_DATASET_KEY_LAYOUT gives every dataset key its own collection, retrievers
+# have to be created with the same layout
+QDRANT_LAYOUT = SHARED_LAYOUT
 
 
 def main():
     client = QdrantClient(host="localhost", port=6333)
     cache = Cache()
+    store = PassageStore()
+
+    dataset_keys = build_passage_store(store)
 
     for model_name in MODEL_NAMES:
         vectorizer = HFVectorizer(model_name, cache)
-        for distance in DISTANCES:
-            insert_passage_data(client, model_name, distance, cache, vectorizer)
-
-
-def get_passage_factory(
-    chunk_size: int, chunk_overlap: int, dataset_name: str
-) -> PassageFactory:
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size, chunk_overlap=chunk_overlap, strip_whitespace=True
-    )
-
-    dataset_getter = (
-        dataset_name == "ipipan/polqa" and PolqaDatasetGetter() or PoquadDatasetGetter()
-    )
-    return PassageFactory(text_splitter, dataset_getter)
+        insert_passage_data(client, model_name, cache, vectorizer, store, dataset_keys)
 
 
 def insert_passage_data(
     client: QdrantClient,
     model_name: str,
-    distance: Distance,
     cache: Cache,
     vectorizer: HFVectorizer,
+    store: PassageStore,
+    dataset_keys: list[str],
 ):
-    collection_name = get_qdrant_collection_name(model_name, distance)
+    passage_prefix = PASSAGE_PREFIX_MAP[model_name]
+    query_prefix = QUERY_PREFIX_MAP[model_name]
+    profile = get_collection_profile(model_name)
+
+    # Every distance gets the same vectors, so they are computed only once
+    repositories = [
+        QdrantRepository(
+            client,
+            get_qdrant_collection_name(model_name, distance),
+            model_name,
+            profile.get_vectors_config(MODEL_DIMENSIONS_MAP[model_name], distance),
+            vectorizer,
+            cache,
+            passage_prefix,
+            query_prefix,
+            QDRANT_LAYOUT,
+            profile,
+        )
+        for distance in DISTANCES
+    ]
 
-    for dataset_name in DATASET_NAMES:
-        for chunk_size, chunk_overlap in CHUNK_SIZES:
-            passage_factory = get_passage_factory(
-                chunk_size, chunk_overlap, dataset_name
-            )
+    # Manifests make reruns skip every point that is already uploaded
+    manifests = [
+        IngestionManifest(repository.collection_name) for repository in repositories
+    ]
 
-            passage_prefix = PASSAGE_PREFIX_MAP[model_name]
-            query_prefix = QUERY_PREFIX_MAP[model_name]
+    for dataset_key in dataset_keys:
+        passages = StoredPassages(store, dataset_key)
 
-            repository = QdrantRepository(
-                client,
-                collection_name,
-                model_name,
-                VectorParams(size=MODEL_DIMENSIONS_MAP[model_name], distance=distance),
-                vectorizer,
-                cache,
-                passage_prefix,
-                query_prefix,
-            )
+        # Points uploaded before the manifests, or under random ids, would be
+        # duplicated by the import, so they are replaced
+        for repository, manifest in zip(repositories, manifests):
+            if manifest.is_new or repository.has_legacy_points(dataset_key):
+                print(f"Replacing {dataset_key} points in {repository.collection_name}")
+                repository.delete_dataset_key(dataset_key)
+                manifest.forget(passages.iter_passages())
 
-            data_importer = QdrantDataImporter(
-                repository, passage_factory, vectorizer, passage_prefix
-            )
+        data_importer = QdrantDataImporter(
+            repositories,
+            passages,
+            vectorizer,
+            passage_prefix,
+            manifests=manifests,
+        )
 
-            data_importer.import_data()
+        data_importer.import_data()
 
 
 main()
@@ -1,14 +1,18 @@
+from common.device import resolve_device
 from rag.rag import RAG
 from retrievers.retriever import Retriever
 from transformers import pipeline, AutoModelForQuestionAnswering, AutoTokenizer
 
 class HDQdrantRAG(RAG):
-    def __init__(self, retriever: Retriever, model_name: str):
+    def __init__(self, retriever: Retriever, model_name: str, device: str = None):
         super().__init__(retriever)
+        self.device = resolve_device(device)
 
         tokenizer = AutoTokenizer.from_pretrained(model_name)
         model = AutoModelForQuestionAnswering.from_pretrained(model_name)
-        self.pipeline = pipeline('question-answering', model=model, tokenizer=tokenizer)
+        self.pipeline = pipeline(
+            'question-answering', model=model, tokenizer=tokenizer, device=self.device
+        )
 
 
     def generate(self, query: str):
@@ -0,0 +1,72 @@
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.helpers import async_bulk
+from cache.async_cache import AsyncCache
+from cache.result_cache import AsyncResultCache
+from common.passage import Passage
+from common.relevance_count_index import RelevanceCountIndex
+from common.result import Result, normalize_scores
+from common.utils import get_relevant_document_count_hash
+from repository.async_repository import AsyncRepository
+from repository.es_repository import (
+    get_count_body,
+    get_search_body,
+    hits_to_raw_passages,
+)
+
+
+class AsyncESRepository(AsyncRepository):
+    def __init__(
+        self,
+        client: AsyncElasticsearch,
+        index_name: str,
+        cache: AsyncCache,
+        relevance_counts: RelevanceCountIndex = None,
+    ):
+        self.client = client
+        self.index_name = index_name
+        self.cache = cache
+        self.relevance_counts = relevance_counts
+        self.result_cache = AsyncResultCache(cache, "es", index_name)
+
+    async def insert_many(self, data: list[Passage]):
+        documents = [d.dict() for d in data]
+        return await async_bulk(self.client, documents, index=self.index_name)
+
+    async def find(self, query: str, dataset_key: str, size: int = 10) -> Result:
+        cached_passages = await self.result_cache.get(query, dataset_key, size)
+
+        if cached_passages is not None:
+            return Result(query, cached_passages)
+
+        body = get_search_body(query, dataset_key, size)
+
+        result = await self.client.search(index=self.index_name, body=body)
+
+        if (len(result["hits"]["hits"])) == 0:
+            return Result(query, [])
+
+        raw_passages = hits_to_raw_passages(result["hits"]["hits"])
+
+        await self.result_cache.set(query, raw_passages, dataset_key, size)
+
+        return Result(query, normalize_scores(raw_passages))
+
+    async def count_relevant_documents(self, passage_id: str, dataset_key: str) -> int:
+        if self.relevance_counts is not None:
+            count = self.relevance_counts.count(passage_id, dataset_key)
+            if count is not None:
+                return count
+
+        hash_key = get_relevant_document_count_hash(passage_id, dataset_key)
+        cached_value = await self.cache.get(hash_key)
+
+        if cached_value is not None:
+            return int(cached_value)
+
+        body = get_count_body(passage_id, dataset_key)
+
+        response = await self.client.count(index=self.index_name, body=body)
+
+        await self.cache.set(hash_key, response["count"])
+
+        return response["count"]
@@ -0,0 +1,179 @@
+import asyncio
+from typing import List
+from cache.async_cache import AsyncCache
+from cache.result_cache import AsyncResultCache
+from common.passage import Passage
+from common.relevance_count_index import RelevanceCountIndex
+from common.result import Result, normalize_scores
+from common.utils import (
+    get_passage_point_id,
+    get_query_with_prefix,
+    get_relevant_document_count_hash,
+)
+from repository.async_repository import AsyncRepository
+from repository.collection_profile import DEFAULT_PROFILE, CollectionProfile
+from repository.qdrant_repository import (
+    PAYLOAD_INDEXES,
+    SHARED_LAYOUT,
+    get_count_filter,
+    get_dataset_key_filter,
+    points_to_raw_passages,
+)
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import VectorParams, PointStruct, Distance
+from vectorizer.vectorizer import Vectorizer
+
+
+class AsyncQdrantRepository(AsyncRepository):
+    def __init__(
+        self,
+        client: AsyncQdrantClient,
+        collection_name: str,
+        model_name: str,
+        vectors_config: VectorParams,
+        vectorizer: Vectorizer,
+        cache: AsyncCache,
+        passage_prefix: str = "",
+        query_prefix: str = "",
+        profile: CollectionProfile = DEFAULT_PROFILE,
+        hnsw_ef: int = None,
+        exact: bool = False,
+        relevance_counts: RelevanceCountIndex = None,
+        layout: str = SHARED_LAYOUT,
+    ):
+        # Async retrieval always searches the shared collection
+        if layout != SHARED_LAYOUT:
+            raise ValueError(
+                f"AsyncQdrantRepository only supports the {SHARED_LAYOUT} layout"
+            )
+
+        self.qdrant = client
+        self.collection_name = collection_name
+        self.model_name = model_name
+        self.vectors_config = vectors_config
+        self.vectorizer = vectorizer
+        self.cache = cache
+        self.result_cache = AsyncResultCache(cache, "qdrant", collection_name)
+        self.passage_prefix = passage_prefix
+        self.query_prefix = query_prefix
+        self.profile = profile
+        self.hnsw_ef = hnsw_ef
+        self.exact = exact
+        self.relevance_counts = relevance_counts
+        self.distance = (
+            Distance.COSINE
+            if Distance.COSINE.lower() in collection_name.lower()
+            else Distance.EUCLID
+        )
+
+    async def init(self):
+        if not await self.qdrant.collection_exists(self.collection_name):
+            print(
+                f"Collection {self.collection_name} not found. Creating collection..."
+            )
+            await self.qdrant.create_collection(
+                collection_name=self.collection_name,
+                vectors_config=self.vectors_config,
+                quantization_config=self.profile.get_quantization_config(),
+                hnsw_config=self.profile.get_hnsw_config(),
+            )
+
+        collection = await self.qdrant.get_collection(self.collection_name)
+        for field_name, field_schema in PAYLOAD_INDEXES.items():
+            if field_name not in collection.payload_schema:
+                await self.qdrant.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=field_name,
+                    field_schema=field_schema,
+                    wait=True,
+                )
+
+        print(f"Async qdrant collection {self.collection_name} repository initialized")
+
+        return self
+
+    async def insert_many(self, passages: List[Passage]):
+        # Embedding is CPU/GPU bound, keep it off the event loop
+        vectors = await asyncio.to_thread(
+            self.vectorizer.get_vectors,
+            [
+                get_query_with_prefix(passage.context, self.passage_prefix)
+                for passage in passages
+            ],
+        )
+
+        points = [
+            PointStruct(
+                id=get_passage_point_id(passage),
+                vector=vector,
+                payload=passage.dict(),
+            )
+            for passage, vector in zip(passages, vectors)
+        ]
+
+        return await self.qdrant.upsert(
+            collection_name=self.collection_name, wait=True, points=points
+        )
+
+    async def find(
+        self,
+        query: str,
+        dataset_key: str,
+        size: int = 10,
+        hnsw_ef: int = None,
+        exact: bool = None,
+    ) -> Result:
+        hnsw_ef = self.hnsw_ef if hnsw_ef is None else hnsw_ef
+        exact = self.exact if exact is None else exact
+        full_query = get_query_with_prefix(query, self.query_prefix)
+        search_key = self.profile.get_search_key(hnsw_ef, exact)
+
+        cached_passages = await self.result_cache.get(
+            full_query, dataset_key, size, search_key
+        )
+
+        if cached_passages is not None:
+            return Result(query, cached_passages)
+
+        vector = await asyncio.to_thread(self.vectorizer.get_vector, full_query)
+
+        data = await self.qdrant.search(
+            collection_name=self.collection_name,
+            query_vector=vector,
+            limit=size,
+            query_filter=get_dataset_key_filter(dataset_key),
+            search_params=self.profile.get_search_params(hnsw_ef, exact),
+        )
+
+        if (len(data)) == 0:
+            return Result(query, [])
+
+        raw_passages = points_to_raw_passages(data)
+
+        await self.result_cache.set(
+            full_query, raw_passages, dataset_key, size, search_key
+        )
+
+        return Result(query, normalize_scores(raw_passages))
+
+    async def count_relevant_documents(self, passage_id, dataset_key) -> int:
+        if self.relevance_counts is not None:
+            count = self.relevance_counts.count(passage_id, dataset_key)
+            if count is not None:
+                return count
+
+        hash_key = get_relevant_document_count_hash(passage_id, dataset_key)
+        cached_value = await self.cache.get(hash_key)
+
+        if cached_value is not None:
+            return int(cached_value)
+
+        result = await self.qdrant.count(
+            collection_name=self.collection_name,
+            count_filter=get_count_filter(passage_id, dataset_key),
+            exact=True,
+        )
+
+        await self.cache.set(hash_key, str(result.count))
+
+        return result.count
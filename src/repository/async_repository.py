@@ -0,0 +1,18 @@
+from abc import ABC, abstractmethod
+from typing import List
+from common.passage import Passage
+from common.result import Result
+
+
+class AsyncRepository(ABC):
+    @abstractmethod
+    async def insert_many(self, data: List[Passage]):
+        pass
+
+    @abstractmethod
+    async def find(self, query, dataset_key, size: int = 10) -> Result:
+        pass
+
+    @abstractmethod
+    async def count_relevant_documents(self, passage_id, dataset_key) -> int:
+        pass
@@ -0,0 +1,133 @@
+import os
+from qdrant_client import models
+from qdrant_client.models import Distance, VectorParams
+
+NO_QUANTIZATION = "none"
+SCALAR_QUANTIZATION = "scalar"
+BINARY_QUANTIZATION = "binary"
+
+# Set to 1 to use MODEL_COLLECTION_PROFILE_MAP when no profile is named
+MODEL_PROFILES_ENV = "POLISH_NL_QA_MODEL_PROFILES"
+
+
+class CollectionProfile:
+    def __init__(
+        self,
+        name: str,
+        quantization: str = NO_QUANTIZATION,
+        on_disk: bool = False,
+        always_ram: bool = True,  # keep quantized vectors in RAM when on_disk
+        rescore: bool = True,
+        oversampling: float = None,
+        hnsw_m: int = None,
+        hnsw_ef_construct: int = None,
+    ):
+        if quantization not in (
+            NO_QUANTIZATION,
+            SCALAR_QUANTIZATION,
+            BINARY_QUANTIZATION,
+        ):
+            raise ValueError(f"Unknown quantization {quantization}")
+
+        self.name = name
+        self.quantization = quantization
+        self.on_disk = on_disk
+        self.always_ram = always_ram
+        self.rescore = rescore
+        self.oversampling = oversampling
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_construct = hnsw_ef_construct
+
+    def get_vectors_config(self, size: int, distance: Distance) -> VectorParams:
+        return VectorParams(size=size, distance=distance, on_disk=self.on_disk or None)
+
+    def get_quantization_config(self):
+        if self.quantization == SCALAR_QUANTIZATION:
+            return models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(
+                    type=models.ScalarType.INT8,
+                    quantile=0.99,
+                    always_ram=self.always_ram,
+                )
+            )
+
+        if self.quantization == BINARY_QUANTIZATION:
+            return models.BinaryQuantization(
+                binary=models.BinaryQuantizationConfig(always_ram=self.always_ram)
+            )
+
+        return None
+
+    def get_hnsw_config(self):
+        if self.hnsw_m is None and self.hnsw_ef_construct is None:
+            return None
+
+        return models.HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct)
+
+    def get_search_params(self, hnsw_ef: int = None, exact: bool = False):
+        quantization = None
+        if self.quantization != NO_QUANTIZATION:
+            quantization = models.QuantizationSearchParams(
+                rescore=self.rescore, oversampling=self.oversampling
+            )
+
+        if hnsw_ef is None and not exact and quantization is None:
+            return None
+
+        return models.SearchParams(
+            hnsw_ef=hnsw_ef, exact=exact, quantization=quantization
+        )
+
+    # Part of the search cache key, empty for the default settings
+    def get_search_key(self, hnsw_ef: int = None, exact: bool = False) -> str:
+        parts = []
+
+        if self.quantization != NO_QUANTIZATION:
+            parts.append(f"{self.name}:{self.rescore}:{self.oversampling}")
+        if hnsw_ef is not None:
+            parts.append(f"hnsw_ef={hnsw_ef}")
+        if exact:
+            parts.append("exact")
+
+        return ";".join(parts)
+
+
+DEFAULT_PROFILE = CollectionProfile("default")
+
+COLLECTION_PROFILES = {
+    profile.name: profile
+    for profile in [
+        DEFAULT_PROFILE,
+        CollectionProfile("scalar", quantization=SCALAR_QUANTIZATION),
+        CollectionProfile(
+            "scalar_on_disk", quantization=SCALAR_QUANTIZATION, on_disk=True
+        ),
+        # Binary quantization only holds up on high dimensional vectors and still
+        # needs oversampling with rescoring to keep recall
+        CollectionProfile(
+            "binary_on_disk",
+            quantization=BINARY_QUANTIZATION,
+            on_disk=True,
+            oversampling=2.0,
+        ),
+        CollectionProfile("high_recall", hnsw_m=32, hnsw_ef_construct=256),
+    ]
+}
+
+# Models missing here use DEFAULT_PROFILE. Opt-in, because collections
+# created before keep the default configuration, while the search params
+# and result cache keys would follow the mapped profile.
+MODEL_COLLECTION_PROFILE_MAP = {
+    "text-embedding-3-large": "binary_on_disk",
+}
+
+
+def get_collection_profile(model_name: str, profile_name: str = None):
+    if profile_name is None:
+        profile_name = DEFAULT_PROFILE.name
+        if os.environ.get(MODEL_PROFILES_ENV) == "1":
+            profile_name = MODEL_COLLECTION_PROFILE_MAP.get(
+                model_name, DEFAULT_PROFILE.name
+            )
+
+    return COLLECTION_PROFILES[profile_name]
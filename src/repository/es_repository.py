@@ -1,21 +1,91 @@
-from typing import List
+import copy
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Iterable, List, Tuple
 from elasticsearch import Elasticsearch, helpers
 from cache.cache import Cache
+from cache.result_cache import ResultCache
 from common.passage import Passage
-from common.result import Result
-from common.utils import (
-    get_es_query_hash,
-    get_relevant_document_count_hash,
-)
+from common.relevance_count_index import RelevanceCountIndex
+from common.result import Result, normalize_scores
+from common.utils import get_relevant_document_count_hash
 from repository.repository import Repository
-import json
+
+
+def get_search_body(query: str, dataset_key: str, size: int) -> dict:
+    return {
+        "size": size,
+        "query": {
+            "bool": {
+                "must": [
+                    {"match": {"context": query}},
+                    {"match": {"dataset_key": dataset_key}},
+                ]
+            }
+        },
+    }
+
+
+def get_count_body(passage_id: str, dataset_key: str) -> dict:
+    must = [{"match": {"dataset_key": dataset_key}}, {"match": {"id": passage_id}}]
+
+    return {
+        "query": {"bool": {"must": must}},
+    }
+
+
+def hits_to_raw_passages(hits: list) -> List[Tuple[Passage, float]]:
+    return [
+        (
+            Passage(
+                hit["_source"]["id"],
+                hit["_source"]["title"],
+                hit["_source"]["context"],
+                hit["_source"]["start_index"],
+                hit["_source"]["dataset"],
+                hit["_source"]["dataset_key"],
+                hit["_source"]["metadata"],
+            ),
+            hit["_score"],
+        )
+        for hit in hits
+    ]
+
+
+def hits_to_passages(hits: list) -> List[Tuple[Passage, float]]:
+    return normalize_scores(hits_to_raw_passages(hits))
+
+
+# Lets several threads take items from one iterator
+class SharedIterator:
+    def __init__(self, iterable: Iterable):
+        self.iterator = iter(iterable)
+        self.lock = threading.Lock()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        with self.lock:
+            return next(self.iterator)
 
 
 class ESRepository(Repository):
-    def __init__(self, client: Elasticsearch, index_name: str, cache: Cache):
+    def __init__(
+        self,
+        client: Elasticsearch,
+        index_name: str,
+        cache: Cache,
+        relevance_counts: RelevanceCountIndex = None,
+        request_timeout: float = None,  # seconds, for searches only
+    ):
         self.client = client
         self.index_name = index_name
         self.cache = cache
+        self.relevance_counts = relevance_counts
+        self.request_timeout = request_timeout
+        self.result_cache = ResultCache(cache, "es", index_name)
 
     def insert_one(self, data: Passage):
         return self.client.index(index=self.index_name, body=data.dict())
@@ -24,71 +94,156 @@ class ESRepository(Repository):
         documents = [d.dict() for d in data]
         return helpers.bulk(self.client, documents, index=self.index_name)
 
+    def insert_many_parallel(
+        self,
+        data: Iterable[Passage],
+        thread_count: int = 4,
+        chunk_size: int = 500,
+        max_chunk_bytes: int = 10 * 1024 * 1024,
+        max_retries: int = 5,
+        initial_backoff: float = 2,
+    ) -> Tuple[int, int]:
+        actions = SharedIterator(
+            {"_index": self.index_name, "_source": d.dict()} for d in data
+        )
+
+        # Every worker runs its own streaming_bulk over the shared actions,
+        # which resends documents rejected with 429 after a backoff
+        def index_chunks() -> Tuple[int, int]:
+            success_count = 0
+            failed_count = 0
+
+            for ok, item in helpers.streaming_bulk(
+                self.client,
+                actions,
+                chunk_size=chunk_size,
+                max_chunk_bytes=max_chunk_bytes,
+                max_retries=max_retries,
+                initial_backoff=initial_backoff,
+                raise_on_error=False,
+                raise_on_exception=False,
+            ):
+                if ok:
+                    success_count += 1
+                else:
+                    failed_count += 1
+                    info = item.get("index", {})
+                    print(f"Failed to index document: {info.get('error')}")
+
+            return success_count, failed_count
+
+        with ThreadPoolExecutor(max_workers=thread_count) as executor:
+            counts = [executor.submit(index_chunks) for _ in range(thread_count)]
+            counts = [future.result() for future in counts]
+
+        return (
+            sum(success_count for success_count, _ in counts),
+            sum(failed_count for _, failed_count in counts),
+        )
+
+    @contextmanager
+    def bulk_load_settings(self):
+        settings = self.client.indices.get_settings(index=self.index_name)
+        index_settings = settings[self.index_name]["settings"]["index"]
+        refresh_interval = index_settings.get("refresh_interval")
+        number_of_replicas = index_settings.get("number_of_replicas")
+
+        self.client.indices.put_settings(
+            index=self.index_name,
+            settings={"index": {"refresh_interval": "-1", "number_of_replicas": 0}},
+        )
+
+        try:
+            yield
+        finally:
+            # A None value resets the setting to the cluster default
+            self.client.indices.put_settings(
+                index=self.index_name,
+                settings={
+                    "index": {
+                        "refresh_interval": refresh_interval,
+                        "number_of_replicas": number_of_replicas,
+                    }
+                },
+            )
+            self.client.indices.refresh(index=self.index_name)
+
+    # Copy sharing the client and caches whose searches give up after timeout
+    def with_request_timeout(self, timeout: float):
+        repository = copy.copy(self)
+        repository.request_timeout = timeout
+        return repository
+
+    def _get_search_client(self) -> Elasticsearch:
+        if self.request_timeout is None:
+            return self.client
+        return self.client.options(request_timeout=self.request_timeout)
+
     def find(self, query: str, dataset_key: str, size: int = 10) -> Result:
-        hash_key = get_es_query_hash(self.index_name, dataset_key, query, size)
-        cached_value = self.cache.get(hash_key)
+        cached_passages = self.result_cache.get(query, dataset_key, size)
+
+        if cached_passages is not None:
+            return Result(query, cached_passages)
+
+        body = get_search_body(query, dataset_key, size)
 
-        if cached_value:
-            dicts = json.loads(cached_value)
-            passages = [(Passage.from_dict(d["passage"]), d["score"]) for d in dicts]
-            return Result(query, passages)
-
-        body = {
-            "size": size,
-            "query": {
-                "bool": {
-                    "must": [
-                        {"match": {"context": query}},
-                        {"match": {"dataset_key": dataset_key}},
-                    ]
-                }
-            },
-        }
-
-        result = self.client.search(index=self.index_name, body=body)
+        result = self._get_search_client().search(index=self.index_name, body=body)
 
         if (len(result["hits"]["hits"])) == 0:
             return Result(query, [])
 
-        max_score = result["hits"]["hits"][0]["_score"]
-        min_score = result["hits"]["hits"][-1]["_score"]
-        score_diff = max_score - min_score
-
-        passages = [
-            (
-                Passage(
-                    hit["_source"]["id"],
-                    hit["_source"]["title"],
-                    hit["_source"]["context"],
-                    hit["_source"]["start_index"],
-                    hit["_source"]["dataset"],
-                    hit["_source"]["dataset_key"],
-                    hit["_source"]["metadata"],
-                ),
-                1 if score_diff == 0 else (hit["_score"] - min_score) / score_diff,
-            )
-            for hit in result["hits"]["hits"]
+        raw_passages = hits_to_raw_passages(result["hits"]["hits"])
+
+        self.result_cache.set(query, raw_passages, dataset_key, size)
+
+        return Result(query, normalize_scores(raw_passages))
+
+    def find_batch(
+        self, queries: List[str], dataset_key: str, size: int = 10
+    ) -> List[Result]:
+        passages_by_query = self.result_cache.get_many(queries, dataset_key, size)
+
+        missing = [
+            query for query in dict.fromkeys(queries) if query not in passages_by_query
         ]
 
-        result_json = json.dumps(
-            [{"passage": p.dict(), "score": s} for (p, s) in passages]
-        )
-        self.cache.set(hash_key, result_json)
+        if missing:
+            searches = []
+            for query in missing:
+                searches.append({"index": self.index_name})
+                searches.append(get_search_body(query, dataset_key, size))
+
+            response = self._get_search_client().msearch(searches=searches)
+
+            raw_passages_by_query = {
+                query: hits_to_raw_passages(item["hits"]["hits"])
+                for query, item in zip(missing, response["responses"])
+            }
 
-        return Result(query, passages)
+            self.result_cache.set_many(raw_passages_by_query, dataset_key, size)
+
+            for query, raw_passages in raw_passages_by_query.items():
+                passages_by_query[query] = normalize_scores(raw_passages)
+
+        return [Result(query, passages_by_query[query]) for query in queries]
 
     def delete(self, query: str):
         body = {"query": {"match": {"text": query}}}
         return self.client.delete_by_query(index=self.index_name, body=body)
 
     def count_relevant_documents(self, passage_id: str, dataset_key: str) -> int:
+        if self.relevance_counts is not None:
+            count = self.relevance_counts.count(passage_id, dataset_key)
+            if count is not None:
+                return count
+
         hash_key = get_relevant_document_count_hash(passage_id, dataset_key)
+        cached_value = self.cache.get(hash_key)
 
-        must = [{"match": {"dataset_key": dataset_key}}, {"match": {"id": passage_id}}]
+        if cached_value is not None:
+            return int(cached_value)
 
-        body = {
-            "query": {"bool": {"must": must}},
-        }
+        body = get_count_body(passage_id, dataset_key)
 
         response = self.client.count(index=self.index_name, body=body)
 
@@ -1,18 +1,30 @@
 from typing import List, Tuple
 from cache.cache import Cache
+from cache.result_cache import ResultCache
 from common.models_dimensions import MODEL_DIMENSIONS_MAP
 from common.passage import Passage
-from common.result import Result
+from common.relevance_count_index import RelevanceCountIndex
+from common.result import Result, normalize_scores
 from common.utils import (
-    get_prompt_hash,
+    get_passage_point_id,
     get_qdrant_collection_name,
     get_relevant_document_count_hash,
 )
+from repository.collection_profile import (
+    DEFAULT_PROFILE,
+    CollectionProfile,
+    get_collection_profile,
+)
+from repository.qdrant_repository import (
+    ensure_collection,
+    get_count_filter,
+    get_dataset_key_filter,
+    points_to_raw_passages,
+    to_vector_list,
+)
 from repository.repository import Repository
 from qdrant_client import QdrantClient, models
 from qdrant_client.models import VectorParams, PointStruct, Distance
-import uuid
-import json
 
 from vectorizer.openai_vectorizer import OpenAIVectorizer
 
@@ -27,27 +39,28 @@ class QdrantOpenAIRepository(Repository):
         vectors_config: VectorParams,
         vectorizer: OpenAIVectorizer,
         cache: Cache,
+        profile: CollectionProfile = DEFAULT_PROFILE,
+        hnsw_ef: int = None,
+        exact: bool = False,
+        relevance_counts: RelevanceCountIndex = None,
     ):
         self.qdrant = client
         self.collection_name = collection_name
         self.model_name = model_name
         self.cache = cache
+        self.result_cache = ResultCache(cache, "qdrant", collection_name)
         self.distance = (
             Distance.COSINE
             if Distance.COSINE.lower() in collection_name.lower()
             else Distance.EUCLID
         )
         self.vectorizer = vectorizer
+        self.profile = profile
+        self.hnsw_ef = hnsw_ef
+        self.exact = exact
+        self.relevance_counts = relevance_counts
 
-        collections = self.qdrant.get_collections()
-        if collection_name not in [
-            collection.name for collection in collections.collections
-        ]:
-            print(f"Collection {collection_name} not found. Creating collection...")
-            self.qdrant.create_collection(
-                collection_name=collection_name,
-                vectors_config=vectors_config,
-            )
+        ensure_collection(self.qdrant, collection_name, vectors_config, profile)
 
         print(f"Qdrant openai collection {collection_name} repository initialized")
 
@@ -57,7 +70,7 @@ class QdrantOpenAIRepository(Repository):
             wait=False,
             points=[
                 PointStruct(
-                    id=str(uuid.uuid4()),
+                    id=get_passage_point_id(passage),
                     vector=self.vectorizer.get_vector(passage.context),
                     payload=passage.dict(),
                 )
@@ -70,7 +83,7 @@ class QdrantOpenAIRepository(Repository):
             wait=False,
             points=[
                 PointStruct(
-                    id=str(uuid.uuid4()),
+                    id=get_passage_point_id(data),
                     vector=vector,
                     payload=data.dict(),
                 )
@@ -80,7 +93,7 @@ class QdrantOpenAIRepository(Repository):
     def insert_many(self, passages: List[Passage]):
         points = [
             PointStruct(
-                id=str(uuid.uuid4()),
+                id=get_passage_point_id(passage),
                 vector=self.vectorizer.get_vector(passage.context),
                 payload=passage.dict(),
             )
@@ -94,7 +107,7 @@ class QdrantOpenAIRepository(Repository):
     def insert_many_with_vectors(self, passages: List[Tuple[Passage, List[float]]]):
         points = [
             PointStruct(
-                id=str(uuid.uuid4()),
+                id=get_passage_point_id(passage),
                 vector=vector,
                 payload=passage.dict(),
             )
@@ -105,64 +118,97 @@ class QdrantOpenAIRepository(Repository):
             collection_name=self.collection_name, wait=True, points=points
         )
 
-    def find(self, query: str, dataset_key: str, size: int = 10) -> Result:
-        full_query = query
-        hash_key = get_prompt_hash(
-            self.model_name, dataset_key, full_query, self.distance, size
+    def _get_search_settings(self, hnsw_ef: int, exact: bool):
+        hnsw_ef = self.hnsw_ef if hnsw_ef is None else hnsw_ef
+        exact = self.exact if exact is None else exact
+
+        return (
+            self.profile.get_search_params(hnsw_ef, exact),
+            self.profile.get_search_key(hnsw_ef, exact),
         )
 
-        cached_value = self.cache.get(hash_key)
+    def find(
+        self,
+        query: str,
+        dataset_key: str,
+        size: int = 10,
+        hnsw_ef: int = None,
+        exact: bool = None,
+    ) -> Result:
+        search_params, search_key = self._get_search_settings(hnsw_ef, exact)
+
+        cached_passages = self.result_cache.get(query, dataset_key, size, search_key)
 
-        if cached_value:
-            dicts = json.loads(cached_value)
-            passages = [(Passage.from_dict(d["passage"]), d["score"]) for d in dicts]
-            return Result(query, passages)
+        if cached_passages is not None:
+            return Result(query, cached_passages)
 
-        vector = self.vectorizer.get_vector(full_query)
+        vector = self.vectorizer.get_vector(query)
 
         data = self.qdrant.search(
             collection_name=self.collection_name,
             query_vector=vector,
             limit=size,
-            query_filter=models.Filter(
-                must=[
-                    models.FieldCondition(
-                        key="dataset_key",
-                        match=models.MatchValue(value=dataset_key),
-                    )
-                ]
-            ),
+            query_filter=get_dataset_key_filter(dataset_key),
+            search_params=search_params,
         )
 
         if (len(data)) == 0:
             return Result(query, [])
 
-        max_score = data[0].score
-        min_score = data[-1].score
-        score_diff = max_score - min_score
-
-        passages = [
-            (
-                Passage(
-                    point.payload["id"],
-                    point.payload["title"],
-                    point.payload["context"],
-                    point.payload["start_index"],
-                    point.payload["dataset"],
-                    point.payload["dataset_key"],
-                    point.payload["metadata"],
-                ),
-                1 if score_diff == 0 else (point.score - min_score) / score_diff,
-            )
-            for point in data
-        ]
+        raw_passages = points_to_raw_passages(data)
+
+        self.result_cache.set(query, raw_passages, dataset_key, size, search_key)
+
+        return Result(query, normalize_scores(raw_passages))
+
+    def find_batch(
+        self,
+        queries: List[str],
+        dataset_key: str,
+        size: int = 10,
+        hnsw_ef: int = None,
+        exact: bool = None,
+    ) -> List[Result]:
+        search_params, search_key = self._get_search_settings(hnsw_ef, exact)
 
-        result_json = json.dumps(
-            [{"passage": p.dict(), "score": s} for (p, s) in passages]
+        passages_by_query = self.result_cache.get_many(
+            queries, dataset_key, size, search_key
         )
-        self.cache.set(hash_key, result_json)
 
-        return Result(query, passages)
+        missing = [
+            query for query in dict.fromkeys(queries) if query not in passages_by_query
+        ]
+
+        if missing:
+            vectors = self.vectorizer.get_vectors(missing)
+
+            responses = self.qdrant.search_batch(
+                collection_name=self.collection_name,
+                requests=[
+                    models.SearchRequest(
+                        vector=to_vector_list(vector),
+                        filter=get_dataset_key_filter(dataset_key),
+                        limit=size,
+                        params=search_params,
+                        with_payload=True,
+                    )
+                    for vector in vectors
+                ],
+            )
+
+            raw_passages_by_query = {
+                query: points_to_raw_passages(data)
+                for query, data in zip(missing, responses)
+            }
+
+            self.result_cache.set_many(
+                raw_passages_by_query, dataset_key, size, search_key
+            )
+
+            for query, raw_passages in raw_passages_by_query.items():
+                passages_by_query[query] = normalize_scores(raw_passages)
+
+        return [Result(query, passages_by_query[query]) for query in queries]
 
     def delete(self, query):
         return self.qdrant.delete(query)
@@ -172,36 +218,43 @@ class QdrantOpenAIRepository(Repository):
         model_name: str,
         distance: Distance,
         cache: Cache,
+        profile_name: str = None,
+        hnsw_ef: int = None,
+        exact: bool = False,
+        relevance_counts: RelevanceCountIndex = None,
     ):
         collection_name = get_qdrant_collection_name(model_name, distance)
         vectorizer = OpenAIVectorizer(model_name, cache)
+        profile = get_collection_profile(model_name, profile_name)
 
         return QdrantOpenAIRepository(
             client,
             collection_name,
             model_name,
-            VectorParams(size=MODEL_DIMENSIONS_MAP[model_name], distance=distance),
+            profile.get_vectors_config(MODEL_DIMENSIONS_MAP[model_name], distance),
             vectorizer,
             cache,
+            profile,
+            hnsw_ef,
+            exact,
+            relevance_counts,
         )
 
     def count_relevant_documents(self, passage_id, dataset_key) -> int:
+        if self.relevance_counts is not None:
+            count = self.relevance_counts.count(passage_id, dataset_key)
+            if count is not None:
+                return count
+
         hash_key = get_relevant_document_count_hash(passage_id, dataset_key)
+        cached_value = self.cache.get(hash_key)
 
-        must = [
-            models.FieldCondition(
-                key="dataset_key",
-                match=models.MatchValue(value=dataset_key),
-            ),
-            models.FieldCondition(
-                key="id",
-                match=models.MatchValue(value=passage_id),
-            ),
-        ]
+        if cached_value is not None:
+            return int(cached_value)
 
         result = self.qdrant.count(
             collection_name=self.collection_name,
-            count_filter=models.Filter(must=must),
+            count_filter=get_count_filter(passage_id, dataset_key),
             exact=True,
         )
 
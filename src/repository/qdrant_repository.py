@@ -1,21 +1,182 @@
-from typing import List, Tuple
+import copy
+import itertools
+import math
+import time
+import uuid
+from typing import Callable, Iterable, List, Tuple
 from cache.cache import Cache
+from cache.result_cache import ResultCache
 from common.models_dimensions import MODEL_DIMENSIONS_MAP
 from common.passage import Passage
-from common.result import Result
+from common.relevance_count_index import RelevanceCountIndex
+from common.result import Result, normalize_scores
 from common.utils import (
-    get_prompt_hash,
+    get_passage_point_id,
     get_qdrant_collection_name,
     get_query_with_prefix,
     get_relevant_document_count_hash,
+    replace_slash_with_dash,
+)
+from repository.collection_profile import (
+    DEFAULT_PROFILE,
+    CollectionProfile,
+    get_collection_profile,
 )
 from repository.repository import Repository
 from qdrant_client import QdrantClient, models
-from qdrant_client.models import VectorParams, PointStruct, Distance
+from qdrant_client.models import (
+    CollectionStatus,
+    Distance,
+    KeywordIndexParams,
+    PayloadSchemaType,
+    PointStruct,
+    VectorParams,
+)
 from vectorizer.hf_vectorizer import HFVectorizer
 from vectorizer.vectorizer import Vectorizer
-import uuid
-import json
+
+SHARED_LAYOUT = "shared"
+PER_DATASET_KEY_LAYOUT = "per_dataset_key"
+
+# Every search filters on dataset_key, so it is marked as the tenant key and
+# Qdrant keeps each dataset key's points together
+PAYLOAD_INDEXES = {
+    "dataset_key": KeywordIndexParams(type="keyword", is_tenant=True),
+    "id": PayloadSchemaType.KEYWORD,
+}
+
+PASSAGE_REF_FIELDS = ["id", "start_index", "dataset_key"]
+
+RETRIEVE_BATCH_SIZE = 256
+
+LEGACY_POINT_SAMPLE_SIZE = 16
+
+
+def get_dataset_key_collection_name(collection_name: str, dataset_key: str) -> str:
+    return replace_slash_with_dash(f"{collection_name}-{dataset_key}")
+
+
+def create_payload_indexes(client: QdrantClient, collection_name: str):
+    payload_schema = client.get_collection(collection_name).payload_schema
+
+    for field_name, field_schema in PAYLOAD_INDEXES.items():
+        if field_name not in payload_schema:
+            print(f"Creating {field_name} payload index on {collection_name}")
+            client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema=field_schema,
+                wait=True,
+            )
+
+
+def ensure_collection(
+    client: QdrantClient,
+    collection_name: str,
+    vectors_config: VectorParams,
+    profile: CollectionProfile = DEFAULT_PROFILE,
+):
+    # The profile only applies to new collections, existing ones keep theirs
+    if not client.collection_exists(collection_name):
+        print(
+            f"Collection {collection_name} not found. Creating collection with {profile.name} profile..."
+        )
+        client.create_collection(
+            collection_name=collection_name,
+            vectors_config=vectors_config,
+            quantization_config=profile.get_quantization_config(),
+            hnsw_config=profile.get_hnsw_config(),
+        )
+
+    create_payload_indexes(client, collection_name)
+
+
+def get_dataset_key_filter(dataset_key: str) -> models.Filter:
+    return models.Filter(
+        must=[
+            models.FieldCondition(
+                key="dataset_key",
+                match=models.MatchValue(value=dataset_key),
+            )
+        ]
+    )
+
+
+def get_count_filter(passage_id: str, dataset_key: str) -> models.Filter:
+    return models.Filter(
+        must=[
+            models.FieldCondition(
+                key="dataset_key",
+                match=models.MatchValue(value=dataset_key),
+            ),
+            models.FieldCondition(
+                key="id",
+                match=models.MatchValue(value=passage_id),
+            ),
+        ]
+    )
+
+
+def get_passages_filter(passages: Iterable[Passage]) -> models.Filter:
+    passages = list(passages)
+
+    return models.Filter(
+        must=[
+            models.FieldCondition(
+                key="dataset_key",
+                match=models.MatchAny(
+                    any=list({passage.dataset_key for passage in passages})
+                ),
+            ),
+            models.FieldCondition(
+                key="id",
+                match=models.MatchAny(any=list({passage.id for passage in passages})),
+            ),
+        ]
+    )
+
+
+def to_vector_list(vector) -> List[float]:
+    return vector.tolist() if hasattr(vector, "tolist") else list(vector)
+
+
+def points_to_raw_passages(points: list) -> List[Tuple[Passage, float]]:
+    return [
+        (
+            Passage(
+                point.payload["id"],
+                point.payload["title"],
+                point.payload["context"],
+                point.payload["start_index"],
+                point.payload["dataset"],
+                point.payload["dataset_key"],
+                point.payload["metadata"],
+            ),
+            point.score,
+        )
+        for point in points
+    ]
+
+
+def points_to_passages(points: list) -> List[Tuple[Passage, float]]:
+    return normalize_scores(points_to_raw_passages(points))
+
+
+def points_to_passage_refs(points: list) -> List[Tuple[Passage, float]]:
+    return [
+        (
+            Passage(
+                point.payload["id"],
+                None,
+                None,
+                point.payload["start_index"],
+                None,
+                point.payload["dataset_key"],
+            ),
+            point.score,
+        )
+        for point in points
+    ]
 
 
 class QdrantRepository(Repository):
@@ -30,12 +191,35 @@ class QdrantRepository(Repository):
         cache: Cache,
         passage_prefix: str = "",
         query_prefix: str = "",
+        layout: str = SHARED_LAYOUT,
+        profile: CollectionProfile = DEFAULT_PROFILE,
+        hnsw_ef: int = None,
+        exact: bool = False,
+        relevance_counts: RelevanceCountIndex = None,
+        request_timeout: float = None,  # seconds, for searches only
     ):
+        if layout not in (SHARED_LAYOUT, PER_DATASET_KEY_LAYOUT):
+            raise ValueError(f"Unknown qdrant layout {layout}")
+
         self.qdrant = client
         self.collection_name = collection_name
         self.model_name = model_name
+        self.vectors_config = vectors_config
+        self.layout = layout
+        self.profile = profile
+        self.hnsw_ef = hnsw_ef
+        self.exact = exact
+        self.relevance_counts = relevance_counts
+        self.request_timeout = request_timeout
+        self.ready_collections = set()
+        # Last point sent without waiting to every collection
+        self.last_points = {}
         self.vectorizer = vectorizer
         self.cache = cache
+        self.result_cache = ResultCache(cache, "qdrant", collection_name)
+        self.passage_ref_result_cache = ResultCache(
+            cache, "qdrant_ids", collection_name
+        )
         self.passage_prefix = passage_prefix
         self.query_prefix = query_prefix
         self.distance = (
@@ -44,50 +228,97 @@ class QdrantRepository(Repository):
             else Distance.EUCLID
         )
 
-        collections = self.qdrant.get_collections()
-        if collection_name not in [
-            collection.name for collection in collections.collections
-        ]:
-            print(f"Collection {collection_name} not found. Creating collection...")
-            self.qdrant.create_collection(
-                collection_name=collection_name,
-                vectors_config=vectors_config,
-            )
+        if layout == SHARED_LAYOUT:
+            self._get_collection_name(None, create=True)
 
         print(f"Qdrant collection {collection_name} repository initialized")
 
-    def insert_one(self, passage: Passage):
+    # Only writes create collections, a search for a dataset key that was
+    # never imported fails instead of finding an empty collection
+    def _get_collection_name(self, dataset_key: str, create: bool = False) -> str:
+        collection_name = (
+            self.collection_name
+            if self.layout == SHARED_LAYOUT
+            else get_dataset_key_collection_name(self.collection_name, dataset_key)
+        )
+
+        if collection_name in self.ready_collections:
+            return collection_name
+
+        if create:
+            ensure_collection(
+                self.qdrant, collection_name, self.vectors_config, self.profile
+            )
+        elif not self.qdrant.collection_exists(collection_name):
+            raise ValueError(
+                f"Qdrant collection {collection_name} does not exist, "
+                f"import {dataset_key} first"
+            )
+
+        self.ready_collections.add(collection_name)
+
+        return collection_name
+
+    def _get_search_filter(self, dataset_key: str):
+        # A per dataset key collection holds nothing else, no filter needed
+        if self.layout == PER_DATASET_KEY_LAYOUT:
+            return None
+
+        return get_dataset_key_filter(dataset_key)
+
+    def _get_search_settings(self, hnsw_ef: int, exact: bool):
+        hnsw_ef = self.hnsw_ef if hnsw_ef is None else hnsw_ef
+        exact = self.exact if exact is None else exact
+
+        return (
+            self.profile.get_search_params(hnsw_ef, exact),
+            self.profile.get_search_key(hnsw_ef, exact),
+        )
+
+    def _upsert(self, points: List[PointStruct], wait: bool):
+        for dataset_key, group in itertools.groupby(
+            points, key=lambda point: point.payload["dataset_key"]
+        ):
+            self.qdrant.upsert(
+                collection_name=self._get_collection_name(dataset_key, create=True),
+                wait=wait,
+                points=list(group),
+            )
+
+    def _upsert_without_wait(self, point: PointStruct):
+        collection_name = self._get_collection_name(
+            point.payload["dataset_key"], create=True
+        )
+        self.last_points[collection_name] = point
+
         return self.qdrant.upsert(
-            collection_name=self.collection_name,
-            wait=False,
-            points=[
-                PointStruct(
-                    id=str(uuid.uuid4()),
-                    vector=self.vectorizer.get_vector(
-                        get_query_with_prefix(passage.context, self.passage_prefix)
-                    ),
-                    payload=passage.dict(),
-                )
-            ],
+            collection_name=collection_name, wait=False, points=[point]
+        )
+
+    def insert_one(self, passage: Passage):
+        return self._upsert_without_wait(
+            PointStruct(
+                id=get_passage_point_id(passage),
+                vector=self.vectorizer.get_vector(
+                    get_query_with_prefix(passage.context, self.passage_prefix)
+                ),
+                payload=passage.dict(),
+            )
         )
 
     def insert_one_with_vector(self, data: Passage, vector):
-        return self.qdrant.upsert(
-            collection_name=self.collection_name,
-            wait=False,
-            points=[
-                PointStruct(
-                    id=str(uuid.uuid4()),
-                    vector=vector,
-                    payload=data.dict(),
-                )
-            ],
+        return self._upsert_without_wait(
+            PointStruct(
+                id=get_passage_point_id(data),
+                vector=vector,
+                payload=data.dict(),
+            )
         )
 
     def insert_many(self, passages: List[Passage]):
         points = [
             PointStruct(
-                id=str(uuid.uuid4()),
+                id=get_passage_point_id(passage),
                 vector=self.vectorizer.get_vector(
                     get_query_with_prefix(passage.context, self.passage_prefix)
                 ),
@@ -96,86 +327,371 @@ class QdrantRepository(Repository):
             for passage in passages
         ]
 
-        return self.qdrant.upsert(
-            collection_name=self.collection_name, wait=True, points=points
-        )
+        return self._upsert(points, wait=True)
 
     def insert_many_with_vectors(self, passages: List[Tuple[Passage, List[float]]]):
         points = [
             PointStruct(
-                id=str(uuid.uuid4()),
+                id=get_passage_point_id(passage),
                 vector=vector,
                 payload=passage.dict(),
             )
             for (passage, vector) in passages
         ]
 
-        return self.qdrant.upsert(
-            collection_name=self.collection_name, wait=True, points=points
-        )
+        return self._upsert(points, wait=True)
+
+    # on_uploaded gets the passages of every chunk once upload_points has sent
+    # them, so a crash never leaves them reported but unwritten
+    def upload_many_with_vectors(
+        self,
+        passages: Iterable[Tuple[Passage, List[float]]],
+        batch_size: int = 256,
+        parallel: int = 1,
+        on_uploaded: Callable[[List[Passage]], None] = None,
+    ):
+        # Passages come grouped by dataset key, so each run is streamed as is
+        for dataset_key, group in itertools.groupby(
+            passages, key=lambda item: item[0].dataset_key
+        ):
+            collection_name = self._get_collection_name(dataset_key, create=True)
+
+            while True:
+                chunk = list(itertools.islice(group, batch_size * parallel))
+                if not chunk:
+                    break
+
+                points = [
+                    PointStruct(
+                        id=get_passage_point_id(passage),
+                        vector=to_vector_list(vector),
+                        payload=passage.dict(),
+                    )
+                    for passage, vector in chunk
+                ]
+                self.qdrant.upload_points(
+                    collection_name=collection_name,
+                    points=points,
+                    batch_size=batch_size,
+                    parallel=parallel,
+                    wait=False,
+                )
+                self.last_points[collection_name] = points[-1]
+
+                if on_uploaded is not None:
+                    on_uploaded([passage for passage, _ in chunk])
+
+    def wait_until_ready(self, timeout: float = 600, interval: float = 1):
+        # Updates are applied in order, so upserting the last point again with
+        # wait returns only once everything sent before it is searchable
+        for collection_name, point in self.last_points.items():
+            self.qdrant.upsert(
+                collection_name=collection_name, wait=True, points=[point]
+            )
+        self.last_points = {}
+
+        # Green only means the optimizers are idle
+        deadline = time.time() + timeout
+        pending = set(self.ready_collections)
+
+        while time.time() < deadline:
+            pending = {
+                collection_name
+                for collection_name in pending
+                if self.qdrant.get_collection(collection_name).status
+                != CollectionStatus.GREEN
+            }
+            if not pending:
+                return True
+            time.sleep(interval)
+
+        print(f"Collections {', '.join(sorted(pending))} are still not ready")
+        return False
+
+    # Copy sharing the client and caches whose searches give up after timeout
+    def with_request_timeout(self, timeout: float):
+        repository = copy.copy(self)
+        repository.request_timeout = timeout
+        return repository
 
-    def find(self, query: str, dataset_key: str, size: int = 10) -> Result:
+    # Qdrant only takes whole seconds
+    def _get_search_timeout(self) -> int:
+        if self.request_timeout is None:
+            return None
+        return max(1, math.ceil(self.request_timeout))
+
+    def find(
+        self,
+        query: str,
+        dataset_key: str,
+        size: int = 10,
+        hnsw_ef: int = None,
+        exact: bool = None,
+    ) -> Result:
         full_query = get_query_with_prefix(query, self.query_prefix)
-        hash_key = get_prompt_hash(
-            self.model_name, dataset_key, full_query, self.distance, size
-        )
+        search_params, search_key = self._get_search_settings(hnsw_ef, exact)
 
-        cached_value = self.cache.get(hash_key)
+        cached_passages = self.result_cache.get(
+            full_query, dataset_key, size, search_key
+        )
 
-        if cached_value:
-            dicts = json.loads(cached_value)
-            passages = [(Passage.from_dict(d["passage"]), d["score"]) for d in dicts]
-            return Result(query, passages)
+        if cached_passages is not None:
+            return Result(query, cached_passages)
 
         vector = self.vectorizer.get_vector(full_query)
 
         data = self.qdrant.search(
-            collection_name=self.collection_name,
+            collection_name=self._get_collection_name(dataset_key),
             query_vector=vector,
             limit=size,
-            query_filter=models.Filter(
-                must=[
-                    models.FieldCondition(
-                        key="dataset_key",
-                        match=models.MatchValue(value=dataset_key),
-                    )
-                ]
-            ),
+            query_filter=self._get_search_filter(dataset_key),
+            search_params=search_params,
+            timeout=self._get_search_timeout(),
         )
 
         if (len(data)) == 0:
             return Result(query, [])
 
-        max_score = data[0].score
-        min_score = data[-1].score
-        score_diff = max_score - min_score
-
-        passages = [
-            (
-                Passage(
-                    point.payload["id"],
-                    point.payload["title"],
-                    point.payload["context"],
-                    point.payload["start_index"],
-                    point.payload["dataset"],
-                    point.payload["dataset_key"],
-                    point.payload["metadata"],
-                ),
-                1 if score_diff == 0 else (point.score - min_score) / score_diff,
-            )
-            for point in data
+        raw_passages = points_to_raw_passages(data)
+
+        self.result_cache.set(full_query, raw_passages, dataset_key, size, search_key)
+
+        return Result(query, normalize_scores(raw_passages))
+
+    def find_batch(
+        self,
+        queries: List[str],
+        dataset_key: str,
+        size: int = 10,
+        hnsw_ef: int = None,
+        exact: bool = None,
+    ) -> List[Result]:
+        return self._search_batch(
+            queries,
+            dataset_key,
+            size,
+            hnsw_ef,
+            exact,
+            self.result_cache,
+            True,
+            points_to_raw_passages,
+        )
+
+    def find_ids(
+        self,
+        query: str,
+        dataset_key: str,
+        size: int = 10,
+        hnsw_ef: int = None,
+        exact: bool = None,
+    ) -> Result:
+        return self.find_ids_batch([query], dataset_key, size, hnsw_ef, exact)[0]
+
+    # Same search as find_batch, but the passages only carry id, start_index
+    # and dataset_key. Use hydrate when the text is needed.
+    def find_ids_batch(
+        self,
+        queries: List[str],
+        dataset_key: str,
+        size: int = 10,
+        hnsw_ef: int = None,
+        exact: bool = None,
+    ) -> List[Result]:
+        return self._search_batch(
+            queries,
+            dataset_key,
+            size,
+            hnsw_ef,
+            exact,
+            self.passage_ref_result_cache,
+            PASSAGE_REF_FIELDS,
+            points_to_passage_refs,
+        )
+
+    def _search_batch(
+        self,
+        queries: List[str],
+        dataset_key: str,
+        size: int,
+        hnsw_ef: int,
+        exact: bool,
+        result_cache: ResultCache,
+        with_payload,
+        to_raw_passages,
+    ) -> List[Result]:
+        full_queries = [
+            get_query_with_prefix(query, self.query_prefix) for query in queries
         ]
+        search_params, search_key = self._get_search_settings(hnsw_ef, exact)
 
-        result_json = json.dumps(
-            [{"passage": p.dict(), "score": s} for (p, s) in passages]
+        passages_by_query = result_cache.get_many(
+            full_queries, dataset_key, size, search_key
         )
-        self.cache.set(hash_key, result_json)
 
-        return Result(query, passages)
+        missing = [
+            full_query
+            for full_query in dict.fromkeys(full_queries)
+            if full_query not in passages_by_query
+        ]
+
+        if missing:
+            vectors = self.vectorizer.get_vectors(missing)
+
+            responses = self.qdrant.search_batch(
+                collection_name=self._get_collection_name(dataset_key),
+                requests=[
+                    models.SearchRequest(
+                        vector=to_vector_list(vector),
+                        filter=self._get_search_filter(dataset_key),
+                        limit=size,
+                        params=search_params,
+                        with_payload=with_payload,
+                    )
+                    for vector in vectors
+                ],
+                timeout=self._get_search_timeout(),
+            )
+
+            raw_passages_by_query = {
+                full_query: to_raw_passages(data)
+                for full_query, data in zip(missing, responses)
+            }
+
+            result_cache.set_many(raw_passages_by_query, dataset_key, size, search_key)
+
+            for full_query, raw_passages in raw_passages_by_query.items():
+                passages_by_query[full_query] = normalize_scores(raw_passages)
+
+        return [
+            Result(query, passages_by_query[full_query])
+            for query, full_query in zip(queries, full_queries)
+        ]
+
+    def hydrate(self, results: List[Result]) -> List[Result]:
+        point_ids_by_collection = {}
+        for result in results:
+            for passage, _ in result.passages:
+                if passage.context is None:
+                    collection_name = self._get_collection_name(passage.dataset_key)
+                    point_ids = point_ids_by_collection.setdefault(collection_name, {})
+                    point_ids[get_passage_point_id(passage)] = None
+
+        passages_by_point_id = {}
+        for collection_name, point_ids in point_ids_by_collection.items():
+            point_ids = list(point_ids)
+
+            for i in range(0, len(point_ids), RETRIEVE_BATCH_SIZE):
+                points = self.qdrant.retrieve(
+                    collection_name=collection_name,
+                    ids=point_ids[i : i + RETRIEVE_BATCH_SIZE],
+                    with_payload=True,
+                    with_vectors=False,
+                )
+
+                for point in points:
+                    passages_by_point_id[str(point.id)] = Passage.from_dict(
+                        point.payload
+                    )
+
+        # Points uploaded before deterministic ids are only found by payload,
+        # all of a collection's misses are fetched by one filtered scroll
+        missing_by_collection = {}
+        for result in results:
+            for passage, _ in result.passages:
+                point_id = get_passage_point_id(passage)
+                if passage.context is None and point_id not in passages_by_point_id:
+                    collection_name = self._get_collection_name(passage.dataset_key)
+                    missing_by_collection.setdefault(collection_name, {})[
+                        point_id
+                    ] = passage
+
+        for collection_name, missing_passages in missing_by_collection.items():
+            scroll_filter = get_passages_filter(missing_passages.values())
+            offset = None
+            while True:
+                points, offset = self.qdrant.scroll(
+                    collection_name=collection_name,
+                    scroll_filter=scroll_filter,
+                    limit=RETRIEVE_BATCH_SIZE,
+                    offset=offset,
+                    with_payload=True,
+                    with_vectors=False,
+                )
+
+                # Other chunks of the same passages come along, only the
+                # missing ones are kept
+                for point in points:
+                    passage = Passage.from_dict(point.payload)
+                    point_id = get_passage_point_id(passage)
+                    if point_id in missing_passages:
+                        passages_by_point_id[point_id] = passage
+
+                if offset is None:
+                    break
+
+        missing = [
+            passage
+            for missing_passages in missing_by_collection.values()
+            for point_id, passage in missing_passages.items()
+            if point_id not in passages_by_point_id
+        ]
+
+        if missing:
+            raise ValueError(
+                "Could not hydrate passages "
+                + ", ".join(
+                    f"{passage.dataset_key}:{passage.id}:{passage.start_index}"
+                    for passage in missing
+                )
+            )
+
+        return [
+            Result(
+                result.query,
+                [
+                    (
+                        (
+                            passages_by_point_id[get_passage_point_id(passage)]
+                            if passage.context is None
+                            else passage
+                        ),
+                        score,
+                    )
+                    for passage, score in result.passages
+                ],
+                result.timings,
+            )
+            for result in results
+        ]
 
     def delete(self, query):
         return self.qdrant.delete(query)
 
+    # Collections loaded before deterministic point ids hold random uuid4 ids,
+    # they are all of one kind so a small sample tells them apart
+    def has_legacy_points(self, dataset_key: str) -> bool:
+        points, _ = self.qdrant.scroll(
+            collection_name=self._get_collection_name(dataset_key, create=True),
+            scroll_filter=get_dataset_key_filter(dataset_key, create=True),
+            limit=LEGACY_POINT_SAMPLE_SIZE,
+            with_payload=False,
+            with_vectors=False,
+        )
+
+        return any(
+            not isinstance(point.id, str) or uuid.UUID(point.id).version != 5
+            for point in points
+        )
+
+    def delete_dataset_key(self, dataset_key: str):
+        return self.qdrant.delete(
+            collection_name=self._get_collection_name(dataset_key, create=True),
+            points_selector=models.FilterSelector(
+                filter=get_dataset_key_filter(dataset_key)
+            ),
+            wait=True,
+        )
+
     def get_repository(
         client: QdrantClient,
         model_name: str,
@@ -183,38 +699,47 @@ class QdrantRepository(Repository):
         cache: Cache,
         passage_prefix: str = "",
         query_prefix: str = "",
+        layout: str = SHARED_LAYOUT,
+        profile_name: str = None,
+        hnsw_ef: int = None,
+        exact: bool = False,
+        relevance_counts: RelevanceCountIndex = None,
     ):
         collection_name = get_qdrant_collection_name(model_name, distance)
         vectorizer = HFVectorizer(model_name, cache)
+        profile = get_collection_profile(model_name, profile_name)
 
         return QdrantRepository(
             client,
             collection_name,
             model_name,
-            VectorParams(size=MODEL_DIMENSIONS_MAP[model_name], distance=distance),
+            profile.get_vectors_config(MODEL_DIMENSIONS_MAP[model_name], distance),
             vectorizer,
             cache,
             passage_prefix,
             query_prefix,
+            layout,
+            profile,
+            hnsw_ef,
+            exact,
+            relevance_counts,
         )
 
     def count_relevant_documents(self, passage_id, dataset_key) -> int:
+        if self.relevance_counts is not None:
+            count = self.relevance_counts.count(passage_id, dataset_key)
+            if count is not None:
+                return count
+
         hash_key = get_relevant_document_count_hash(passage_id, dataset_key)
+        cached_value = self.cache.get(hash_key)
 
-        must = [
-            models.FieldCondition(
-                key="dataset_key",
-                match=models.MatchValue(value=dataset_key),
-            ),
-            models.FieldCondition(
-                key="id",
-                match=models.MatchValue(value=passage_id),
-            ),
-        ]
+        if cached_value is not None:
+            return int(cached_value)
 
         result = self.qdrant.count(
-            collection_name=self.collection_name,
-            count_filter=models.Filter(must=must),
+            collection_name=self._get_collection_name(dataset_key),
+            count_filter=get_count_filter(passage_id, dataset_key),
             exact=True,
         )
 
@@ -17,6 +17,10 @@ class Repository(ABC):
     def find(self, query, dataset_key) -> Result:
         pass
 
+    @abstractmethod
+    def find_batch(self, queries, dataset_key, size: int = 10) -> List[Result]:
+        pass
+
     @abstractmethod
     def delete(self, query):
         pass
@@ -1,49 +1,31 @@
-import json
 from typing import List
 
 from cache.cache import Cache
+from common.device import resolve_device
+from common.model_registry import CROSS_ENCODER, get_model_registry
 from common.models_dimensions import RERANKER_MODEL_DIMENSIONS_MAP
-from common.passage import Passage
 from common.result import Result
-from common.utils import get_reranker_hash
+from common.utils import get_reranker_score_hash
 from rerankers.reranker import Reranker
-from sentence_transformers import CrossEncoder
 
 
 class HFReranker(Reranker):
-    def __init__(self, model_name: str, cache: Cache):
+    def __init__(self, model_name: str, cache: Cache, device: str = None):
         self.model_name = model_name
-        self.model = CrossEncoder(
-            model_name, max_length=RERANKER_MODEL_DIMENSIONS_MAP[model_name]
+        self.device = resolve_device(device)
+        self.model, self._release_model = get_model_registry().acquire(
+            self,
+            CROSS_ENCODER,
+            model_name,
+            self.device,
+            RERANKER_MODEL_DIMENSIONS_MAP[model_name],
         )
         self.cache = cache
 
         print(f"Vectorizer with model {model_name} initialized")
 
-    def rerank(self, result: Result, count: int, dataset_key: str) -> Result:
-        if (len(result.passages)) == 0:
-            return result
-
-        passages_ids = [passage[0].id for passage in result.passages]
-        sorted_passages_ids = sorted(passages_ids)
-
-        hash_key = get_reranker_hash(
-            self.model_name, result.query, sorted_passages_ids, dataset_key, count
-        )
-
-        maybe_cached_result = self.cache.get(hash_key)
-
-        if maybe_cached_result:
-            dicts = json.loads(maybe_cached_result)
-            passages = [(Passage.from_dict(d["passage"]), d["score"]) for d in dicts]
-            return Result(result.query, passages)
-
-        pairs = [[result.query, passage[0].context] for passage in result.passages]
-
-        results = self.model.predict(pairs)
-        results_list = results.tolist()
-
-        scored_passages = list(zip(results_list, result.passages))
+    def _get_top_passages(self, result: Result, scores: list, count: int) -> Result:
+        scored_passages = list(zip(scores, result.passages))
         sorted_passages = sorted(scored_passages, key=lambda x: x[0], reverse=True)
         top_n_passages = sorted_passages[:count]
         top_n_passages = [(passage, score) for score, (passage, _) in top_n_passages]
@@ -58,11 +40,52 @@ class HFReranker(Reranker):
             for (p, s) in top_n_passages
         ]
 
-        reranked_result = Result(result.query, normalized_passages)
-
-        result_json = json.dumps(
-            [{"passage": p.dict(), "score": s} for (p, s) in normalized_passages]
-        )
-        self.cache.set(hash_key, result_json)
+        return Result(result.query, normalized_passages)
 
-        return reranked_result
+    def rerank(self, result: Result, count: int, dataset_key: str) -> Result:
+        return self.rerank_batch([result], count, dataset_key)[0]
+
+    def get_scores(self, results: List[Result]) -> List[List[float]]:
+        hash_keys = [
+            [
+                get_reranker_score_hash(
+                    self.model_name,
+                    result.query,
+                    passage.id,
+                    passage.dataset_key,
+                    passage.start_index,
+                )
+                for passage, _ in result.passages
+            ]
+            for result in results
+        ]
+        scores = self.cache.get_many([key for keys in hash_keys for key in keys])
+
+        # Only pairs that were never scored go through the cross-encoder
+        missing_pairs = {}
+        for result, keys in zip(results, hash_keys):
+            for (passage, _), hash_key in zip(result.passages, keys):
+                if hash_key not in scores:
+                    missing_pairs[hash_key] = [result.query, passage.context]
+
+        if missing_pairs:
+            predicted = self.model.predict(list(missing_pairs.values())).tolist()
+            new_scores = dict(zip(missing_pairs.keys(), predicted))
+            self.cache.set_many(new_scores)
+            scores.update(new_scores)
+
+        return [[scores[key] for key in keys] for keys in hash_keys]
+
+    def rerank_batch(
+        self, results: List[Result], count: int, dataset_key: str
+    ) -> List[Result]:
+        scores = self.get_scores(results)
+
+        return [
+            (
+                self._get_top_passages(result, result_scores, count)
+                if result.passages
+                else result
+            )
+            for result, result_scores in zip(results, scores)
+        ]
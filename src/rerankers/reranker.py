@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import List
 from common.result import Result
 
 
@@ -6,3 +7,7 @@ class Reranker(ABC):
     @abstractmethod
     def rerank(self, result: Result, count: int) -> Result:
         pass
+
+    @abstractmethod
+    def rerank_batch(self, results: List[Result], count: int) -> List[Result]:
+        pass
@@ -0,0 +1,29 @@
+import asyncio
+from common.result import Result
+from repository.async_es_repository import AsyncESRepository
+from rerankers.hf_reranker import HFReranker
+from retrievers.async_retriever import AsyncRetriever
+
+
+class AsyncESRetriever(AsyncRetriever):
+    def __init__(
+        self,
+        repository: AsyncESRepository,
+        dataset_key: str,
+        reranker: HFReranker = None,
+    ):
+        self.repository = repository
+        self.dataset_key = dataset_key
+        self.reranker = reranker
+
+    async def get_relevant_passages(self, query: str, size: int = 10) -> Result:
+        docs_size = size * 2 if self.reranker else size
+
+        result = await self.repository.find(query, self.dataset_key, docs_size)
+
+        if self.reranker:
+            result = await asyncio.to_thread(
+                self.reranker.rerank, result, size, self.dataset_key
+            )
+
+        return result
@@ -0,0 +1,111 @@
+import asyncio
+import time
+from common.result import Result
+from repository.async_es_repository import AsyncESRepository
+from repository.async_qdrant_repository import AsyncQdrantRepository
+from rerankers.hf_reranker import HFReranker
+from retrievers.async_retriever import AsyncRetriever
+from retrievers.fusion import WEIGHTED, fuse
+
+
+class AsyncHybridRetriever(AsyncRetriever):
+    def __init__(
+        self,
+        es_repository: AsyncESRepository,
+        qdrant_repository: AsyncQdrantRepository,
+        dataset_key: str,
+        alpha: float = 0.5,  # weight for ES
+        reranker: HFReranker = None,
+        es_timeout: float = None,  # seconds, None waits for the leg
+        qdrant_timeout: float = None,
+        fusion: str = WEIGHTED,  # weighted, rrf or combmnz
+        rrf_k: int = 60,
+        es_candidate_k: int = 10,
+        qdrant_candidate_k: int = 10,
+        final_k: int = 10,
+        rerank_k: int = None,  # fused candidates passed to the reranker
+    ):
+        self.es_repository = es_repository
+        self.qdrant_repository = qdrant_repository
+        self.dataset_key = dataset_key
+        self.alpha = alpha
+        self.reranker = reranker
+        self.es_timeout = es_timeout
+        self.qdrant_timeout = qdrant_timeout
+        self.fusion = fusion
+        self.rrf_k = rrf_k
+        self.es_candidate_k = es_candidate_k
+        self.qdrant_candidate_k = qdrant_candidate_k
+        self.final_k = final_k
+        self.rerank_k = rerank_k
+
+    async def _timed_find(
+        self, name: str, repository, query: str, size: int, timeout: float
+    ):
+        start = time.perf_counter()
+
+        try:
+            result = await asyncio.wait_for(
+                repository.find(query, self.dataset_key, size), timeout
+            )
+        except asyncio.TimeoutError:
+            print(f"Hybrid {name} leg missed its deadline, using the other leg only")
+            return None, None
+        except Exception as e:
+            print(f"Hybrid {name} leg failed ({e}), using the other leg only")
+            return None, None
+
+        return result, time.perf_counter() - start
+
+    async def get_relevant_passages(self, query: str, size: int = None) -> Result:
+        start = time.perf_counter()
+        final_k = size or self.final_k
+        rerank_k = self.rerank_k or final_k
+
+        (es_result, es_time), (qdrant_result, qdrant_time) = await asyncio.gather(
+            self._timed_find(
+                "es",
+                self.es_repository,
+                query,
+                self.es_candidate_k,
+                self.es_timeout,
+            ),
+            self._timed_find(
+                "qdrant",
+                self.qdrant_repository,
+                query,
+                self.qdrant_candidate_k,
+                self.qdrant_timeout,
+            ),
+        )
+
+        if es_result is None and qdrant_result is None:
+            raise RuntimeError(f"Both hybrid legs failed for query: {query}")
+
+        fused_passages = fuse(
+            [
+                es_result.passages if es_result is not None else [],
+                qdrant_result.passages if qdrant_result is not None else [],
+            ],
+            [self.alpha, 1 - self.alpha],
+            self.fusion,
+            self.rrf_k,
+        )
+
+        # A leg that missed its deadline is reported with a None timing
+        timings = {"es": es_time, "qdrant": qdrant_time}
+
+        if self.reranker:
+            result = Result(query, fused_passages[:rerank_k])
+            rerank_start = time.perf_counter()
+            result = await asyncio.to_thread(
+                self.reranker.rerank, result, final_k, self.dataset_key
+            )
+            timings["reranker"] = time.perf_counter() - rerank_start
+        else:
+            result = Result(query, fused_passages[:final_k])
+
+        timings["total"] = time.perf_counter() - start
+        result.timings = timings
+
+        return result
@@ -0,0 +1,29 @@
+import asyncio
+from common.result import Result
+from repository.async_qdrant_repository import AsyncQdrantRepository
+from rerankers.hf_reranker import HFReranker
+from retrievers.async_retriever import AsyncRetriever
+
+
+class AsyncQdrantRetriever(AsyncRetriever):
+    def __init__(
+        self,
+        repository: AsyncQdrantRepository,
+        dataset_key: str,
+        reranker: HFReranker = None,
+    ):
+        self.repository = repository
+        self.dataset_key = dataset_key
+        self.reranker = reranker
+
+    async def get_relevant_passages(self, query: str, size: int = 10) -> Result:
+        docs_size = size * 2 if self.reranker else size
+
+        result = await self.repository.find(query, self.dataset_key, docs_size)
+
+        if self.reranker:
+            result = await asyncio.to_thread(
+                self.reranker.rerank, result, size, self.dataset_key
+            )
+
+        return result
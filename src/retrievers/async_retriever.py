@@ -0,0 +1,26 @@
+import asyncio
+from abc import ABC, abstractmethod
+from typing import List
+
+from common.result import Result
+
+
+class AsyncRetriever(ABC):
+    @abstractmethod
+    async def get_relevant_passages(self, query: str) -> Result:
+        pass
+
+    # Without a size every retriever applies its own default
+    async def get_relevant_passages_batch(
+        self, queries: List[str], size: int = None
+    ) -> List[Result]:
+        return await asyncio.gather(
+            *(
+                (
+                    self.get_relevant_passages(query)
+                    if size is None
+                    else self.get_relevant_passages(query, size)
+                )
+                for query in queries
+            )
+        )
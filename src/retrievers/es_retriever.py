@@ -22,3 +22,15 @@ class ESRetriever(Retriever):
             result = self.reranker.rerank(result, size, self.dataset_key)
 
         return result
+
+    def get_relevant_passages_batch(
+        self, queries: List[str], size: int = 10
+    ) -> List[Result]:
+        docs_size = size * 2 if self.reranker else size
+
+        results = self.repository.find_batch(queries, self.dataset_key, docs_size)
+
+        if self.reranker:
+            results = self.reranker.rerank_batch(results, size, self.dataset_key)
+
+        return results
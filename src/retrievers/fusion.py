@@ -0,0 +1,69 @@
+from typing import List, Tuple
+
+import numpy as np
+
+from common.passage import Passage
+
+WEIGHTED = "weighted"
+RRF = "rrf"
+COMBMNZ = "combmnz"
+
+FUSION_STRATEGIES = [WEIGHTED, RRF, COMBMNZ]
+
+
+def fuse(
+    legs: List[List[Tuple[Passage, float]]],
+    weights: List[float],
+    strategy: str = WEIGHTED,
+    rrf_k: int = 60,
+) -> List[Tuple[Passage, float]]:
+    if strategy not in FUSION_STRATEGIES:
+        raise ValueError(f"Unknown fusion strategy: {strategy}")
+
+    # Passage ids are mapped to column indices in first-seen order, so ties
+    # keep the order in which the legs returned them
+    columns = {}
+    passages = []
+    leg_indices = []
+    column_indices = []
+    ranks = []
+    scores = []
+
+    for leg_index, leg in enumerate(legs):
+        for rank, (passage, score) in enumerate(leg):
+            column = columns.setdefault(passage.id, len(columns))
+            if column == len(passages):
+                passages.append(passage)
+
+            leg_indices.append(leg_index)
+            column_indices.append(column)
+            ranks.append(rank)
+            scores.append(score)
+
+    if not passages:
+        return []
+
+    leg_indices = np.array(leg_indices)
+    column_indices = np.array(column_indices)
+    ranks = np.array(ranks, dtype=np.float64)
+    scores = np.array(scores, dtype=np.float64)
+    leg_weights = np.array(weights, dtype=np.float64)[:, None]
+
+    matrix = np.zeros((len(legs), len(passages)))
+
+    if strategy == WEIGHTED:
+        np.add.at(matrix, (leg_indices, column_indices), scores)
+        fused = (matrix * leg_weights).sum(axis=0)
+    elif strategy == RRF:
+        # Only the best ranked chunk of a passage counts within a leg
+        np.maximum.at(matrix, (leg_indices, column_indices), 1 / (rrf_k + ranks + 1))
+        fused = (matrix * leg_weights).sum(axis=0)
+    else:
+        present = np.zeros((len(legs), len(passages)), dtype=bool)
+        present[leg_indices, column_indices] = True
+        np.maximum.at(matrix, (leg_indices, column_indices), scores)
+        fused = (matrix * leg_weights).sum(axis=0) * present.sum(axis=0)
+
+    order = np.argsort(-fused, kind="stable")
+
+    return [(passages[i], float(fused[i])) for i in order]
@@ -1,12 +1,18 @@
-from collections import defaultdict
+import time
 from typing import List
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
 from common.result import Result
 from repository.es_repository import ESRepository
 from repository.qdrant_repository import QdrantRepository
 from rerankers.hf_reranker import HFReranker
+from retrievers.fusion import WEIGHTED, fuse
 from retrievers.retriever import Retriever
 
 
+def get_batch_timeout(timeout: float, query_count: int) -> float:
+    return None if timeout is None else timeout * max(1, query_count)
+
+
 class HybridRetriever(Retriever):
     def __init__(
         self,
@@ -15,36 +21,182 @@ class HybridRetriever(Retriever):
         dataset_key: str,
         alpha: float = 0.5,  # weight for ES
         reranker: HFReranker = None,
+        es_timeout: float = None,  # seconds per query, None waits for the leg
+        qdrant_timeout: float = None,
+        max_workers: int = 4,  # two per concurrent query
+        fusion: str = WEIGHTED,  # weighted, rrf or combmnz
+        rrf_k: int = 60,
+        es_candidate_k: int = 10,
+        qdrant_candidate_k: int = 10,
+        final_k: int = 10,
+        rerank_k: int = None,  # fused candidates passed to the reranker
     ):
+        # The clients give up at the leg deadline too, a leg that misses it
+        # would otherwise keep running and hold its worker. Qdrant rounds the
+        # timeout up to whole seconds.
+        if es_timeout is not None:
+            es_repository = es_repository.with_request_timeout(es_timeout)
+        if qdrant_timeout is not None:
+            qdrant_repository = qdrant_repository.with_request_timeout(qdrant_timeout)
+
         self.es_repository = es_repository
         self.qdrant_repository = qdrant_repository
         self.dataset_key = dataset_key
         self.alpha = alpha
         self.reranker = reranker
+        self.es_timeout = es_timeout
+        self.qdrant_timeout = qdrant_timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.fusion = fusion
+        self.rrf_k = rrf_k
+        self.es_candidate_k = es_candidate_k
+        self.qdrant_candidate_k = qdrant_candidate_k
+        self.final_k = final_k
+        self.rerank_k = rerank_k
 
-    def get_relevant_passages(self, query: str) -> List[str]:
-        es_result = self.es_repository.find(query, self.dataset_key)
-        qdrant_result = self.qdrant_repository.find(query, self.dataset_key)
+    def _timed_find(self, repository, query: str, size: int):
+        start = time.perf_counter()
+        result = repository.find(query, self.dataset_key, size)
+        return result, time.perf_counter() - start
 
-        weighted_es_passages = [
-            (passage, score * self.alpha) for passage, score in es_result.passages
-        ]
-        weighted_qdrant_passages = [
-            (passage, score * (1 - self.alpha))
-            for passage, score in qdrant_result.passages
-        ]
+    def _timed_find_batch(self, repository, queries: List[str], size: int):
+        start = time.perf_counter()
+        results = repository.find_batch(queries, self.dataset_key, size)
+        return results, time.perf_counter() - start
+
+    def _wait_for_leg(self, name: str, future, deadline: float):
+        timeout = None if deadline is None else max(0, deadline - time.perf_counter())
+
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            print(f"Hybrid {name} leg missed its deadline, using the other leg only")
+        except Exception as e:
+            print(f"Hybrid {name} leg failed ({e}), using the other leg only")
 
-        combined_scores = defaultdict(float)
+        future.cancel()
+        return None, None
 
-        for passage, score in weighted_es_passages + weighted_qdrant_passages:
-            combined_scores[passage] += score
+    def _fuse(self, es_result: Result, qdrant_result: Result):
+        return fuse(
+            [
+                es_result.passages if es_result is not None else [],
+                qdrant_result.passages if qdrant_result is not None else [],
+            ],
+            [self.alpha, 1 - self.alpha],
+            self.fusion,
+            self.rrf_k,
+        )
 
-        final_results = list(combined_scores.items())
-        final_results.sort(key=lambda x: x[1], reverse=True)
+    def get_relevant_passages(self, query: str, size: int = None) -> Result:
+        start = time.perf_counter()
+        final_k = size or self.final_k
+        rerank_k = self.rerank_k or final_k
 
-        result = Result(query, final_results[:10])
+        es_future = self.executor.submit(
+            self._timed_find, self.es_repository, query, self.es_candidate_k
+        )
+        qdrant_future = self.executor.submit(
+            self._timed_find, self.qdrant_repository, query, self.qdrant_candidate_k
+        )
+
+        es_deadline = None if self.es_timeout is None else start + self.es_timeout
+        qdrant_deadline = (
+            None if self.qdrant_timeout is None else start + self.qdrant_timeout
+        )
+
+        es_result, es_time = self._wait_for_leg("es", es_future, es_deadline)
+        qdrant_result, qdrant_time = self._wait_for_leg(
+            "qdrant", qdrant_future, qdrant_deadline
+        )
+
+        if es_result is None and qdrant_result is None:
+            raise RuntimeError(f"Both hybrid legs failed for query: {query}")
+
+        fused_passages = self._fuse(es_result, qdrant_result)
+
+        # A leg that missed its deadline is reported with a None timing
+        timings = {"es": es_time, "qdrant": qdrant_time}
 
         if self.reranker:
-            result = self.reranker.rerank(result, 10, self.dataset_key)
+            result = Result(query, fused_passages[:rerank_k])
+            rerank_start = time.perf_counter()
+            result = self.reranker.rerank(result, final_k, self.dataset_key)
+            timings["reranker"] = time.perf_counter() - rerank_start
+        else:
+            result = Result(query, fused_passages[:final_k])
+
+        timings["total"] = time.perf_counter() - start
+        result.timings = timings
 
         return result
+
+    def get_relevant_passages_batch(
+        self, queries: List[str], size: int = None
+    ) -> List[Result]:
+        start = time.perf_counter()
+        final_k = size or self.final_k
+        rerank_k = self.rerank_k or final_k
+
+        # The timeouts are per query, a batch gets the budget of all its queries
+        es_timeout = get_batch_timeout(self.es_timeout, len(queries))
+        qdrant_timeout = get_batch_timeout(self.qdrant_timeout, len(queries))
+
+        es_repository = self.es_repository
+        if es_timeout is not None:
+            es_repository = es_repository.with_request_timeout(es_timeout)
+        qdrant_repository = self.qdrant_repository
+        if qdrant_timeout is not None:
+            qdrant_repository = qdrant_repository.with_request_timeout(qdrant_timeout)
+
+        es_future = self.executor.submit(
+            self._timed_find_batch, es_repository, queries, self.es_candidate_k
+        )
+        qdrant_future = self.executor.submit(
+            self._timed_find_batch,
+            qdrant_repository,
+            queries,
+            self.qdrant_candidate_k,
+        )
+
+        es_deadline = None if es_timeout is None else start + es_timeout
+        qdrant_deadline = None if qdrant_timeout is None else start + qdrant_timeout
+
+        es_results, es_time = self._wait_for_leg("es", es_future, es_deadline)
+        qdrant_results, qdrant_time = self._wait_for_leg(
+            "qdrant", qdrant_future, qdrant_deadline
+        )
+
+        if es_results is None and qdrant_results is None:
+            raise RuntimeError("Both hybrid legs failed for the query batch")
+
+        es_results = es_results or [None] * len(queries)
+        qdrant_results = qdrant_results or [None] * len(queries)
+
+        # Timings are measured for the whole batch and shared by its results
+        timings = {"es": es_time, "qdrant": qdrant_time}
+
+        fused_results = [
+            self._fuse(es_result, qdrant_result)
+            for es_result, qdrant_result in zip(es_results, qdrant_results)
+        ]
+
+        if self.reranker:
+            results = [
+                Result(query, fused_passages[:rerank_k])
+                for query, fused_passages in zip(queries, fused_results)
+            ]
+            rerank_start = time.perf_counter()
+            results = self.reranker.rerank_batch(results, final_k, self.dataset_key)
+            timings["reranker"] = time.perf_counter() - rerank_start
+        else:
+            results = [
+                Result(query, fused_passages[:final_k])
+                for query, fused_passages in zip(queries, fused_results)
+            ]
+
+        timings["total"] = time.perf_counter() - start
+        for result in results:
+            result.timings = timings
+
+        return results
@@ -11,17 +11,43 @@ class QdrantRetriever(Retriever):
         repository: QdrantRepository,
         dataset_key: str,
         reranker: HFReranker = None,
+        ids_only: bool = False,  # skip passage text unless the reranker needs it
     ):
         self.repository = repository
         self.dataset_key = dataset_key
         self.reranker = reranker
+        self.ids_only = ids_only
 
     def get_relevant_passages(self, query: str, size: int = 10) -> Result:
         docs_size = size * 2 if self.reranker else size
 
-        result = self.repository.find(query, self.dataset_key, docs_size)
+        if self.ids_only:
+            result = self.repository.find_ids(query, self.dataset_key, docs_size)
+        else:
+            result = self.repository.find(query, self.dataset_key, docs_size)
 
         if self.reranker:
+            if self.ids_only:
+                result = self.repository.hydrate([result])[0]
             result = self.reranker.rerank(result, size, self.dataset_key)
 
         return result
+
+    def get_relevant_passages_batch(
+        self, queries: List[str], size: int = 10
+    ) -> List[Result]:
+        docs_size = size * 2 if self.reranker else size
+
+        if self.ids_only:
+            results = self.repository.find_ids_batch(
+                queries, self.dataset_key, docs_size
+            )
+        else:
+            results = self.repository.find_batch(queries, self.dataset_key, docs_size)
+
+        if self.reranker:
+            if self.ids_only:
+                results = self.repository.hydrate(results)
+            results = self.reranker.rerank_batch(results, size, self.dataset_key)
+
+        return results
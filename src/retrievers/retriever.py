@@ -8,3 +8,7 @@ class Retriever(ABC):
     @abstractmethod
     def get_relevant_passages(self, query: str) -> Result:
         pass
+
+    @abstractmethod
+    def get_relevant_passages_batch(self, queries: List[str]) -> List[Result]:
+        pass
@@ -0,0 +1,265 @@
+import multiprocessing
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List
+from elasticsearch import Elasticsearch
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance
+from cache.cache import Cache
+from common.device import NUM_THREADS_ENV, detect_device
+from common.experiment_results import (
+    ES_BACKEND,
+    OPENAI_BACKEND,
+    QDRANT_BACKEND,
+    ExperimentJob,
+    ExperimentResultsStore,
+    get_experiment_jobs,
+    get_fingerprint,
+)
+from common.models_dimensions import MODEL_DIMENSIONS_MAP
+from common.names import (
+    DATASET_SEED,
+    PASSAGE_PREFIX_MAP,
+    QUERY_PREFIX_MAP,
+    RERANKER_MODEL_NAMES,
+)
+from common.passage_ingestion import build_passage_store
+from common.passage_store import PassageStore
+from common.relevance_count_index import RelevanceCountIndex
+from common.utils import get_qdrant_collection_name
+from dataset.polqa_dataset_getter import PolqaDatasetGetter
+from dataset.poquad_dataset_getter import PoquadDatasetGetter
+from evaluation.batch_retriever_evaluator import BatchRetrieverEvaluator
+from repository.collection_profile import get_collection_profile
+from repository.es_repository import ESRepository
+from repository.qdrant_openai_repository import QdrantOpenAIRepository
+from repository.qdrant_repository import QdrantRepository
+from rerankers.hf_reranker import HFReranker
+from retrievers.es_retriever import ESRetriever
+from retrievers.qdrant_retriever import QdrantRetriever
+from vectorizer.hf_vectorizer import HFVectorizer
+
+# Bump when the evaluation itself changes, every stored cell becomes stale
+EXPERIMENT_VERSION = 1
+
+BACKENDS = [ES_BACKEND, QDRANT_BACKEND, OPENAI_BACKEND]
+RERANKERS = [None] + RERANKER_MODEL_NAMES
+TOP_KS = [1, 3, 5, 10, 20]
+SAMPLE_SIZE = 500
+QUERY_BATCH_SIZE = 64
+
+WORKERS_ENV = "POLISH_NL_QA_EXPERIMENT_WORKERS"
+
+# State of one worker process, set up once by init_worker
+_worker = {}
+
+
+def get_worker_count() -> int:
+    if WORKERS_ENV in os.environ:
+        return int(os.environ[WORKERS_ENV])
+
+    # A single accelerator is shared badly between processes
+    if detect_device() != "cpu":
+        return 1
+
+    return max(1, (os.cpu_count() or 1) // 4)
+
+
+def init_worker(worker_count: int):
+    # Workers split the cores instead of each one using all of them
+    os.environ.setdefault(
+        NUM_THREADS_ENV, str(max(1, (os.cpu_count() or 1) // worker_count))
+    )
+
+    _worker["cache"] = Cache()
+    _worker["es_client"] = Elasticsearch(hosts=["http://localhost:9200"])
+    _worker["qdrant_client"] = QdrantClient(host="localhost", port=6333)
+    _worker["relevance_counts"] = RelevanceCountIndex(PassageStore())
+    _worker["datasets"] = {}
+    _worker["models"] = {}
+
+
+# Tasks are submitted ordered by model, so a worker keeps the one model of
+# each kind it used last and rarely has to load another
+def get_model(kind: str, model_name: str, load):
+    loaded = _worker["models"].get(kind)
+
+    if loaded is None or loaded[0] != model_name:
+        _worker["models"].pop(kind, None)
+        _worker["models"][kind] = (model_name, load())
+
+    return _worker["models"][kind][1]
+
+
+def get_dataset(dataset_key: str):
+    dataset_name = "poquad" if "poquad" in dataset_key else "polqa"
+
+    if dataset_name not in _worker["datasets"]:
+        dataset_getter = (
+            PoquadDatasetGetter() if dataset_name == "poquad" else PolqaDatasetGetter()
+        )
+        _worker["datasets"][dataset_name] = dataset_getter.get_random_n_test(
+            SAMPLE_SIZE, DATASET_SEED
+        )
+
+    return _worker["datasets"][dataset_name]
+
+
+def get_retriever(job: ExperimentJob):
+    cache = _worker["cache"]
+    relevance_counts = _worker["relevance_counts"]
+
+    reranker = None
+    if job.reranker is not None:
+        reranker = get_model(
+            "reranker", job.reranker, lambda: HFReranker(job.reranker, cache)
+        )
+
+    if job.backend == ES_BACKEND:
+        repository = ESRepository(
+            _worker["es_client"], job.index, cache, relevance_counts
+        )
+        return ESRetriever(repository, job.dataset_key, reranker)
+
+    distance = Distance(job.distance)
+
+    if job.backend == OPENAI_BACKEND:
+        repository = QdrantOpenAIRepository.get_repository(
+            _worker["qdrant_client"],
+            job.index,
+            distance,
+            cache,
+            relevance_counts=relevance_counts,
+        )
+        return QdrantRetriever(repository, job.dataset_key, reranker)
+
+    vectorizer = get_model(
+        "vectorizer", job.index, lambda: HFVectorizer(job.index, cache)
+    )
+    profile = get_collection_profile(job.index)
+    repository = QdrantRepository(
+        _worker["qdrant_client"],
+        get_qdrant_collection_name(job.index, distance),
+        job.index,
+        profile.get_vectors_config(MODEL_DIMENSIONS_MAP[job.index], distance),
+        vectorizer,
+        cache,
+        PASSAGE_PREFIX_MAP[job.index],
+        QUERY_PREFIX_MAP[job.index],
+        profile=profile,
+        relevance_counts=relevance_counts,
+    )
+    # Without a reranker only the passage ids are compared
+    return QdrantRetriever(
+        repository, job.dataset_key, reranker, ids_only=reranker is None
+    )
+
+
+def run_job(job: ExperimentJob) -> dict:
+    entries = get_dataset(job.dataset_key)
+    retriever = get_retriever(job)
+
+    results = []
+    for i in range(0, len(entries), QUERY_BATCH_SIZE):
+        queries = [entry.question for entry in entries[i : i + QUERY_BATCH_SIZE]]
+        results += retriever.get_relevant_passages_batch(queries, job.top_k)
+
+    evaluator = BatchRetrieverEvaluator(_worker["relevance_counts"], seed=0)
+    summary = evaluator.evaluate_results(
+        results,
+        [entry.passage_id for entry in entries],
+        job.dataset_key,
+        job.top_k,
+    )
+
+    return {
+        metric: {name: values.tolist() for name, values in statistics.items()}
+        for metric, statistics in summary.items()
+    }
+
+
+def run_jobs(job_dicts: List[dict]) -> List[tuple]:
+    finished = []
+
+    for job_dict in job_dicts:
+        job = ExperimentJob.from_dict(job_dict)
+        try:
+            finished.append((job_dict, run_job(job), None))
+        except Exception:
+            finished.append((job_dict, None, traceback.format_exc()))
+
+    return finished
+
+
+def get_job_fingerprint(job: ExperimentJob, store: PassageStore) -> str:
+    # A rebuilt passage store changes what every index holds
+    return get_fingerprint(
+        EXPERIMENT_VERSION,
+        SAMPLE_SIZE,
+        DATASET_SEED,
+        job.key(),
+        os.path.getmtime(store.get_path(job.dataset_key)),
+    )
+
+
+def main():
+    store = PassageStore()
+    build_passage_store(store)
+
+    results_store = ExperimentResultsStore("retrievers")
+    jobs = get_experiment_jobs(BACKENDS, RERANKERS, TOP_KS)
+    fingerprints = {job.key(): get_job_fingerprint(job, store) for job in jobs}
+
+    pending = [
+        job
+        for job in jobs
+        if not results_store.is_current(job, fingerprints[job.key()])
+    ]
+    print(f"{len(jobs) - len(pending)} cells are up to date, {len(pending)} to run")
+
+    if not pending:
+        return
+
+    # All top-k cells of one search run in the same task, so the smaller ones
+    # are served by the result cache of the deepest one
+    tasks = {}
+    for job in sorted(
+        pending, key=lambda job: (job.backend, job.index, str(job.reranker))
+    ):
+        task_key = (job.backend, job.index, job.distance, job.dataset_key, job.reranker)
+        tasks.setdefault(task_key, []).append(job.dict())
+
+    for task in tasks.values():
+        task.sort(key=lambda job_dict: -job_dict["top_k"])
+
+    worker_count = get_worker_count()
+    print(f"Running {len(tasks)} tasks on {worker_count} workers")
+
+    # spawn keeps CUDA and database clients out of forked children
+    with ProcessPoolExecutor(
+        max_workers=worker_count,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+        initargs=(worker_count,),
+    ) as executor:
+        futures = [executor.submit(run_jobs, task) for task in tasks.values()]
+
+        failed = 0
+        for future in as_completed(futures):
+            for job_dict, scores, error in future.result():
+                job = ExperimentJob.from_dict(job_dict)
+
+                if error is not None:
+                    failed += 1
+                    print(f"Cell {job.key()} failed:\n{error}")
+                    continue
+
+                results_store.save(job, fingerprints[job.key()], scores)
+                print(f"Finished {job.key()}")
+
+    print(f"Experiments finished, {failed} cells failed")
+
+
+if __name__ == "__main__":
+    main()
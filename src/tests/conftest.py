@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modules import each other flat, the way the scripts in src run
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
@@ -0,0 +1,68 @@
+import time
+from common.passage import Passage
+from common.result import Result
+from retrievers.hybrid_retriever import HybridRetriever
+
+QUERY_TIME = 0.05
+
+
+# Answers every query of a batch in QUERY_TIME, unless its request timeout
+# runs out first
+class SlowRepository:
+    def __init__(self, name: str, request_timeout: float = None):
+        self.name = name
+        self.request_timeout = request_timeout
+
+    def with_request_timeout(self, timeout: float):
+        return SlowRepository(self.name, timeout)
+
+    def find_batch(self, queries, dataset_key, size):
+        elapsed = QUERY_TIME * len(queries)
+        if self.request_timeout is not None and elapsed > self.request_timeout:
+            time.sleep(self.request_timeout)
+            raise TimeoutError(f"{self.name} request timed out")
+
+        time.sleep(elapsed)
+        return [
+            Result(
+                query,
+                [(Passage(f"{self.name}-{query}", None, "", 0, None, dataset_key), 1)],
+            )
+            for query in queries
+        ]
+
+
+def test_batch_within_per_query_budget_keeps_both_legs():
+    queries = [f"query {i}" for i in range(8)]
+    retriever = HybridRetriever(
+        SlowRepository("es"),
+        SlowRepository("qdrant"),
+        "dataset",
+        es_timeout=QUERY_TIME * 2,
+        qdrant_timeout=QUERY_TIME * 2,
+    )
+
+    results = retriever.get_relevant_passages_batch(queries)
+
+    assert results[0].timings["es"] is not None
+    assert results[0].timings["qdrant"] is not None
+    for query, result in zip(queries, results):
+        assert {passage.id for passage, _ in result.passages} == {
+            f"es-{query}",
+            f"qdrant-{query}",
+        }
+
+
+def test_batch_over_budget_drops_the_slow_leg():
+    queries = [f"query {i}" for i in range(4)]
+    retriever = HybridRetriever(
+        SlowRepository("es"),
+        SlowRepository("qdrant"),
+        "dataset",
+        es_timeout=QUERY_TIME / 2,
+    )
+
+    results = retriever.get_relevant_passages_batch(queries)
+
+    assert results[0].timings["es"] is None
+    assert [passage.id for passage, _ in results[0].passages] == ["qdrant-query 0"]
@@ -0,0 +1,112 @@
+import pytest
+
+# mlx_lm only installs on Apple silicon
+pytest.importorskip("mlx_lm")
+pytest.importorskip("nltk")
+torch = pytest.importorskip("torch")
+
+import numpy as np
+from common.passage import Passage
+from common.result import Result
+from evaluation import ragas_evaulator_v2
+from evaluation.ragas_evaulator_v2 import RAGASEvaluatorV2
+
+KEYWORDS = ["kot", "pies", "ptak"]
+CONTEXT = "kot śpi. pies biega. ptak śpiewa."
+
+
+class FakeCache:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value):
+        self.values[key] = value
+
+
+# One dimension per keyword, so every sentence is most similar to the context
+# sentence about the same animal
+class FakeVectorizer:
+    def __init__(self):
+        self.calls = 0
+
+    def get_vectors(self, texts, batch_size=32):
+        self.calls += 1
+        return [
+            torch.tensor([float(keyword in text) for keyword in KEYWORDS])
+            for text in texts
+        ]
+
+    def get_similarity(self, vector1, vector2):
+        return vector1 @ vector2.T
+
+
+# Positive only for a context sentence about the same animal
+class FakeReranker:
+    def __init__(self):
+        self.pairs = []
+
+    def predict(self, pairs):
+        self.pairs.extend(pairs)
+        return [
+            2.0 if sentence.split()[0] == context_sentence.split()[0] else -2.0
+            for sentence, context_sentence in pairs
+        ]
+
+
+def get_evaluator(top_m: int) -> RAGASEvaluatorV2:
+    evaluator = RAGASEvaluatorV2.__new__(RAGASEvaluatorV2)
+    evaluator.reranker_model = FakeReranker()
+    evaluator.vectorizer = FakeVectorizer()
+    evaluator.cache = FakeCache()
+    evaluator.faithfulness_top_m = top_m
+    evaluator.passage_sentences = {}
+
+    return evaluator
+
+
+def get_result() -> Result:
+    passage = Passage("1", None, CONTEXT, 0, None, "dataset")
+
+    return Result("pytanie", [(passage, 1)])
+
+
+@pytest.fixture(autouse=True)
+def split_on_periods(monkeypatch):
+    monkeypatch.setattr(
+        ragas_evaulator_v2,
+        "sent_tokenize",
+        lambda text: [sentence.strip() + "." for sentence in text.split(".")[:-1]],
+    )
+
+
+@pytest.mark.parametrize("top_m", [0, -1, 1.5, True])
+def test_invalid_top_m_is_rejected(top_m):
+    with pytest.raises(ValueError):
+        RAGASEvaluatorV2("reranker", FakeCache(), "generator", FakeVectorizer(), top_m)
+
+
+@pytest.mark.parametrize("top_m", [3, 10])
+def test_top_m_over_context_size_scores_every_sentence(top_m):
+    evaluator = get_evaluator(top_m)
+    expected = get_evaluator(None).faithfulness(get_result(), "kot śpi. pies je.")
+
+    faithfulness = evaluator.faithfulness(get_result(), "kot śpi. pies je.")
+
+    assert evaluator.vectorizer.calls == 0
+    assert len(evaluator.reranker_model.pairs) == 6
+    assert faithfulness == pytest.approx(expected)
+
+
+def test_top_m_one_scores_the_most_similar_sentence():
+    evaluator = get_evaluator(1)
+
+    faithfulness = evaluator.faithfulness(get_result(), "kot śpi. pies je.")
+
+    assert evaluator.reranker_model.pairs == [
+        ["kot śpi.", "kot śpi."],
+        ["pies je.", "pies biega."],
+    ]
+    assert faithfulness == pytest.approx(1 / (1 + np.exp(-10)))
@@ -0,0 +1,10 @@
+from common.utils import get_reranker_score_hash
+
+
+def test_reranker_score_hash_keeps_field_boundaries():
+    assert get_reranker_score_hash(
+        "model", "query 1", "2", "key", 0
+    ) != get_reranker_score_hash("model", "query ", "12", "key", 0)
+    assert get_reranker_score_hash(
+        "model", "query", "passage", "key", 10
+    ) != get_reranker_score_hash("model", "query", "passage", "key1", 0)
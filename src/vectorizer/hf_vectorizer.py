@@ -1,18 +1,27 @@
-import json
-from typing import Any
+from typing import Any, List
 
-import torch
 from cache.cache import Cache
+from common.device import resolve_device
+from common.model_registry import SENTENCE_TRANSFORMER, get_model_registry
 from common.utils import get_vectorizer_hash
+from vectorizer.vector_codec import decode_vector, encode_vector
 from vectorizer.vectorizer import Vectorizer
-from sentence_transformers import SentenceTransformer
 
 
 class HFVectorizer(Vectorizer):
-    def __init__(self, model_name: str, cache: Cache):
-        self.device = "mps"
+    def __init__(
+        self,
+        model_name: str,
+        cache: Cache,
+        vector_dtype: str = "float32",
+        device: str = None,
+    ):
+        self.device = resolve_device(device)
         self.model_name = model_name
-        self.model = SentenceTransformer(model_name, device=self.device)
+        self.vector_dtype = vector_dtype
+        self.model, self._release_model = get_model_registry().acquire(
+            self, SENTENCE_TRANSFORMER, model_name, self.device
+        )
         self.max_seq_length = self.model.max_seq_length
         self.cache = cache
 
@@ -24,16 +33,47 @@ class HFVectorizer(Vectorizer):
         maybe_hashed_vector = self.cache.get(hash_key)
 
         if maybe_hashed_vector:
-            vector_json = json.loads(maybe_hashed_vector)
-            hashed_vector = torch.tensor(vector_json)
-            return hashed_vector
+            return decode_vector(maybe_hashed_vector)
 
         hashed_vector = self.model.encode(query, convert_to_tensor=True)
-        vector_list = hashed_vector.tolist()
-        vector_json = json.dumps(vector_list)
-        self.cache.set(hash_key, vector_json)
+        self.cache.set(hash_key, encode_vector(hashed_vector, self.vector_dtype))
 
         return hashed_vector.to(self.device)
 
+    def get_vectors(self, texts: List[str], batch_size: int = 32) -> List[Any]:
+        hash_keys = [get_vectorizer_hash(self.model_name, text) for text in texts]
+        cached_vectors = self.cache.get_many(hash_keys)
+
+        vectors = {
+            hash_key: decode_vector(value) for hash_key, value in cached_vectors.items()
+        }
+
+        missing_texts = {
+            hash_key: text
+            for hash_key, text in zip(hash_keys, texts)
+            if hash_key not in vectors
+        }
+        # Encoding similar lengths together keeps padding inside a batch small
+        sorted_missing = sorted(missing_texts.items(), key=lambda x: len(x[1]))
+
+        for i in range(0, len(sorted_missing), batch_size):
+            batch = sorted_missing[i : i + batch_size]
+            encoded = self.model.encode(
+                [text for _, text in batch],
+                batch_size=batch_size,
+                convert_to_tensor=True,
+            ).cpu()
+
+            new_vectors = {
+                hash_key: vector for (hash_key, _), vector in zip(batch, encoded)
+            }
+            self.cache.set_many(
+                (hash_key, encode_vector(vector, self.vector_dtype))
+                for hash_key, vector in new_vectors.items()
+            )
+            vectors.update(new_vectors)
+
+        return [vectors[hash_key] for hash_key in hash_keys]
+
     def get_similarity(self, vector1: Any, vector2: Any) -> float:
         return self.model.similarity(vector1.to(self.device), vector2.to(self.device))
@@ -1,8 +1,7 @@
-import json
-from typing import Any
-import torch
+from typing import Any, List
 from cache.cache import Cache
 from common.utils import get_vectorizer_hash
+from vectorizer.vector_codec import decode_vector
 from vectorizer.vectorizer import Vectorizer
 
 
@@ -19,11 +18,22 @@ class OpenAIVectorizer(Vectorizer):
         maybe_hashed_vector = self.cache.get(hash_key)
 
         if maybe_hashed_vector:
-            vector_json = json.loads(maybe_hashed_vector)
-            hashed_vector = torch.tensor(vector_json)
-            return hashed_vector
+            return decode_vector(maybe_hashed_vector)
 
         return []
 
+    def get_vectors(self, texts: List[str], batch_size: int = 32) -> List[Any]:
+        hash_keys = [get_vectorizer_hash(self.model_name, text) for text in texts]
+        cached_vectors = self.cache.get_many(hash_keys)
+
+        return [
+            (
+                decode_vector(cached_vectors[hash_key])
+                if hash_key in cached_vectors
+                else []
+            )
+            for hash_key in hash_keys
+        ]
+
     def get_similarity(self, vector1: Any, vector2: Any) -> float:
         return 0.0
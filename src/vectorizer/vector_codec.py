@@ -0,0 +1,57 @@
+import json
+import warnings
+from typing import Any
+
+import numpy as np
+import torch
+from bson.binary import Binary
+
+VECTOR_DTYPES = {
+    "float32": np.dtype("<f4"),
+    "float16": np.dtype("<f2"),
+    "int8": np.dtype("i1"),
+}
+
+
+def _to_numpy(vector: Any) -> np.ndarray:
+    if isinstance(vector, torch.Tensor):
+        vector = vector.detach().to("cpu", torch.float32).numpy()
+    return np.asarray(vector, dtype=np.float32)
+
+
+def encode_vector(vector: Any, dtype: str = "float32") -> dict:
+    array = _to_numpy(vector)
+    scale = None
+
+    if dtype == "int8":
+        max_abs = float(np.abs(array).max()) if array.size else 0.0
+        scale = max_abs / 127 if max_abs > 0 else 1.0
+        array = np.round(array / scale)
+
+    data = array.astype(VECTOR_DTYPES[dtype]).tobytes()
+
+    return {"dtype": dtype, "scale": scale, "data": Binary(data)}
+
+
+def decode_vector(value: Any) -> torch.Tensor:
+    # Entries written before the binary codec are JSON float lists
+    if isinstance(value, str):
+        return torch.tensor(json.loads(value))
+    if isinstance(value, list):
+        return torch.tensor(value)
+
+    dtype = value["dtype"]
+    array = np.frombuffer(value["data"], dtype=VECTOR_DTYPES[dtype])
+
+    if dtype == "float32":
+        # Zero-copy view over the cached bytes, torch warns because the
+        # buffer is read-only but the tensor is never written in place
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            return torch.from_numpy(array)
+
+    array = array.astype(np.float32)
+    if value["scale"] is not None:
+        array *= value["scale"]
+
+    return torch.from_numpy(array)
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, List
 
 
 class Vectorizer(ABC):
@@ -7,6 +7,10 @@ class Vectorizer(ABC):
     def get_vector(self, text: str) -> Any:
         pass
 
+    @abstractmethod
+    def get_vectors(self, texts: List[str], batch_size: int = 32) -> List[Any]:
+        pass
+
     @abstractmethod
     def get_similarity(self, vector1: Any, vector2: Any) -> float:
         pass